@@ -0,0 +1,152 @@
+"""
+商品图片API路由
+功能：返回商品图片，支持按宽度缩放和转码为WebP/AVIF（变体生成后缓存到磁盘），
+     支持带内容指纹的文件名（长期缓存）和预压缩文件
+说明：该路由需在/images静态目录挂载之前注册，子目录等其余路径仍由静态文件服务处理
+"""
+
+import logging
+import mimetypes
+import os
+from pathlib import Path
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.responses import FileResponse
+
+from config import settings
+from utils.httpCache import etag_matches
+from utils.imageVariants import (
+    IMAGE_FORMATS,
+    SUPPORTED_FORMATS,
+    image_variant_cache,
+    negotiate_format,
+    source_format,
+)
+from utils.staticAssets import IMMUTABLE_CACHE_CONTROL, StaticAsset, static_manifest
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["images"])
+
+# 普通图片URL的Cache-Control头（变体文件名随原图修改时间变化，内容更新后浏览器最多一天内获取新图）
+IMAGE_CACHE_CONTROL = "public, max-age=86400"
+
+
+def resolve_source(name: str) -> tuple[Path, StaticAsset | None, bool]:
+    """
+    解析原图路径（只允许STATIC_DIR下的文件名，防止路径穿越），支持带指纹的文件名
+    :return: (原图路径, 静态资源清单条目, 是否可按immutable缓存)
+    :raises HTTPException: 图片不存在时返回404
+    """
+    asset = static_manifest.get_hashed(name)
+    if asset is not None:
+        # 指纹文件名：原图自构建清单后被替换时内容与指纹不再一致，退回普通缓存策略
+        return asset.path, asset, asset.fresh
+    source = Path(settings.STATIC_DIR) / name
+    if name != Path(name).name or name.startswith(".") or not source.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="图片不存在")
+    return source, static_manifest.get(name), False
+
+
+def image_response(
+    path: Path, media_type: str | None, if_none_match: str | None, headers: dict
+) -> Response:
+    """返回图片文件（If-None-Match命中ETag时返回304）"""
+    # 传入stat_result时立即生成ETag/Last-Modified头，用于判断是否返回304
+    response = FileResponse(
+        path, media_type=media_type, headers=headers, stat_result=os.stat(path)
+    )
+    if etag_matches(if_none_match, response.headers["etag"]):
+        headers["ETag"] = response.headers["etag"]
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return response
+
+
+def original_response(
+    source: Path,
+    asset: StaticAsset | None,
+    if_none_match: str | None,
+    accept_encoding: str | None,
+    headers: dict,
+) -> Response:
+    """返回原图，客户端支持时返回预压缩文件（gzip/brotli）"""
+    if asset is not None and asset.encodings and asset.fresh:
+        headers["Vary"] = "Accept-Encoding"
+        compressed = static_manifest.precompressed(asset, accept_encoding)
+        if compressed is not None:
+            path, encoding = compressed
+            headers["Content-Encoding"] = encoding
+            media_type = mimetypes.guess_type(source.name)[0]
+            return image_response(path, media_type, if_none_match, headers)
+    return image_response(source, None, if_none_match, headers)
+
+
+@router.get(
+    "/images/{name}",
+    response_class=FileResponse,
+    status_code=status.HTTP_200_OK,
+    summary="获取商品图片",
+    description="""
+    #### 接口功能
+    - 返回商品图片；传入w/fmt时返回缩放、转码后的变体（首次请求时生成并缓存到磁盘）
+    #### 参数说明
+    1. w：目标宽度，只允许IMAGE_VARIANT_WIDTHS中的值，不放大原图
+    2. fmt：输出格式webp/avif/jpeg/png；auto按请求头Accept选择WebP/AVIF
+    3. 都不传时返回原图
+    #### 说明
+    - 服务器未安装Pillow或变体生成失败时返回原图
+    - 带内容指纹的文件名（如apple.3f2a9c1b.jpg，由商品列表接口返回）按immutable长期缓存
+    """,
+    responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "内容未变化"},
+        status.HTTP_404_NOT_FOUND: {"description": "图片不存在"},
+    },
+)
+async def get_image(
+    name: str,
+    w: Annotated[int | None, Query(description="目标宽度（像素）")] = None,
+    fmt: Annotated[
+        Literal["auto", "webp", "avif", "jpeg", "png"] | None,
+        Query(description="输出格式，auto按Accept协商"),
+    ] = None,
+    accept: Annotated[str | None, Header()] = None,
+    accept_encoding: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    source, asset, immutable = resolve_source(name)
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else IMAGE_CACHE_CONTROL
+    }
+    if w is None and fmt is None:
+        return original_response(source, asset, if_none_match, accept_encoding, headers)
+
+    if w is not None and w not in settings.IMAGE_VARIANT_WIDTHS:
+        widths = ",".join(map(str, settings.IMAGE_VARIANT_WIDTHS))
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"field": "w", "message": f"不支持的图片宽度，可选：{widths}"},
+        )
+    if not SUPPORTED_FORMATS:
+        # 未安装Pillow：无法生成变体，返回原图
+        return original_response(source, asset, if_none_match, accept_encoding, headers)
+    if fmt not in (None, "auto") and fmt not in SUPPORTED_FORMATS:
+        formats = ",".join(["auto", *SUPPORTED_FORMATS])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"field": "fmt", "message": f"不支持的图片格式，可选：{formats}"},
+        )
+
+    if fmt == "auto":
+        variant_format = negotiate_format(accept, source)
+    else:
+        variant_format = fmt or source_format(source)
+    try:
+        variant = await image_variant_cache.get(source, w, variant_format)
+    except Exception as e:
+        logger.error(f"图片变体生成失败，返回原图：{name}，错误={str(e)}", exc_info=True)
+        return original_response(source, asset, if_none_match, accept_encoding, headers)
+    if fmt == "auto":
+        headers["Vary"] = "Accept"
+    return image_response(
+        variant, IMAGE_FORMATS[variant_format][1], if_none_match, headers
+    )
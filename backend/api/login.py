@@ -2,10 +2,19 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Annotated
 from sqlmodel import Session, select
 from config import ACCESS_TOKEN_EXPIRE_HOURS
-from schemas.user.userLogin import UserLogin, LoginResponse
+from schemas.user.userLogin import (
+    UserLogin,
+    LoginResponse,
+    RefreshTokenRequest,
+    RefreshTokenResponse,
+)
 from schemas.user.userResponse import UserResponse
-from utils.hashPassword import verify_password
+from utils.hashPassword import verify_password_async
 from utils.token import create_access_token
+from utils.rateLimit import login_ip_limit, login_account_limit
+from utils.refreshToken import issue_refresh_token, rotate_refresh_token, RefreshTokenError
+from utils.currentUser import load_user_snapshot
+from utils.userFilter import account_might_exist
 from model.user import User
 from database import get_session
 from datetime import timedelta, datetime
@@ -17,8 +26,17 @@ logger = logging.getLogger(__name__)
 router = APIRouter(tags=["login"])
 
 
+def issue_access_token(user_id: int, username: str) -> str:
+    """生成访问令牌（sub按JWT规范使用字符串；type区分访问令牌与重置密码令牌）"""
+    return create_access_token(
+        data={"sub": str(user_id), "username": username, "type": "access"},
+        expires_delta=timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS),
+    )
+
+
 @router.post(
     "/login",
+    dependencies=[Depends(login_ip_limit), Depends(login_account_limit)],
     response_model=LoginResponse,
     status_code=status.HTTP_200_OK,
     summary="用户登录接口",
@@ -30,6 +48,7 @@ router = APIRouter(tags=["login"])
     1. 账号校验：用户名/邮箱是否存在
     2. 密码校验：密码哈希比对（bcrypt算法）
     3. 状态校验：账户是否处于激活状态
+    4. 频率限制：按IP和账号分别限流，超出限制返回429（Retry-After为需等待的秒数）
     """,
 )
 async def login(
@@ -41,6 +60,13 @@ async def login(
             f"用户登录请求：登录账号={login_data.username}，请求时间={datetime.now()}"
         )
 
+        # 过滤器判定账号一定不存在：不查库、不做bcrypt校验，直接返回
+        if not await account_might_exist(login_data.username):
+            logger.warning(f"登录失败：账号不存在，请求账号={login_data.username}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="用户名或密码错误"
+            )
+
         # 查找用户(支持用户名或邮箱登录)
         statement = select(User).where(
             (User.username == login_data.username) | (User.email == login_data.username)
@@ -55,7 +81,7 @@ async def login(
             )
 
         # 2. 密码错误校验
-        if not verify_password(login_data.password, user.hashed_password):
+        if not await verify_password_async(login_data.password, user.hashed_password):
             logger.warning(
                 f"登录失败：密码错误，用户ID={user.id}，用户名={user.username}"
             )
@@ -72,12 +98,10 @@ async def login(
                 status_code=status.HTTP_403_FORBIDDEN, detail="账户已被禁用"
             )
 
-        # 生成JWT token
-        access_token_expires = timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-        token = create_access_token(
-            data={"sub": user.id, "username": user.username},
-            expires_delta=access_token_expires,
-        )
+        # 生成JWT token和刷新令牌
+        token = issue_access_token(user.id, user.username)
+        refresh_token = issue_refresh_token(session, user.id)
+        await session.commit()
 
         # 新增：记录登录成功日志（包含用户关键信息，便于审计）
         logger.info(
@@ -94,6 +118,7 @@ async def login(
                 created_at=user.created_at,
             ),
             token=token,
+            refresh_token=refresh_token,
         )
 
     # 新增：异常分类捕获与日志记录
@@ -110,3 +135,50 @@ async def login(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="服务器内部错误，请稍后重试",
         )
+
+
+@router.post(
+    "/token/refresh",
+    response_model=RefreshTokenResponse,
+    status_code=status.HTTP_200_OK,
+    summary="刷新访问令牌",
+    description="""
+    #### 接口功能
+    - 使用刷新令牌换取新的访问令牌和新的刷新令牌（旧刷新令牌立即作废）
+    - 不需要提交密码，访问令牌过期后客户端调用此接口续期
+    #### 校验规则
+    1. 刷新令牌是否存在、是否过期、是否已使用（已使用的令牌再次提交会吊销该登录的全部刷新令牌）
+    2. 用户是否存在且处于激活状态
+    """,
+)
+async def refresh_access_token(
+    request: RefreshTokenRequest, session: Annotated[Session, Depends(get_session)]
+):
+    try:
+        try:
+            user_id, refresh_token = await rotate_refresh_token(
+                session, request.refresh_token
+            )
+        except RefreshTokenError as e:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+        user = await load_user_snapshot(user_id)
+        if user is None or not user.is_active:
+            logger.warning(f"刷新令牌失败：用户不存在或已禁用，用户ID={user_id}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="刷新令牌已失效，请重新登录"
+            )
+
+        return RefreshTokenResponse(
+            token=issue_access_token(user.id, user.username),
+            refresh_token=refresh_token,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"刷新令牌失败：未知异常，异常详情={str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="服务器内部错误，请稍后重试",
+        )
@@ -7,22 +7,25 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import select, Session, update
-from datetime import datetime, timedelta
+from datetime import datetime
 from zoneinfo import ZoneInfo
 import random
 import logging
 
 from model.user import User
-from model.verificationCode import VerificationCode
 from schemas.email.email import (
     SendCodeRequest,
     VerifyCodeRequest,
     ResetPasswordRequest,
 )
 from database import get_session
-from utils.hashPassword import hash_password
-from utils.emailService import email_service
+from utils.hashPassword import hash_password_async
+from utils.rateLimit import send_code_email_limit, send_code_ip_limit
+from utils.outboxDispatcher import enqueue_email, outbox_dispatcher
 from utils.token import create_reset_token
+from utils.userFilter import account_might_exist
+from utils.refreshToken import revoke_refresh_tokens_by_email
+from utils.verificationStore import get_verification_store
 from config import settings
 import jwt
 
@@ -37,18 +40,19 @@ def generate_verification_code() -> str:
 
 @router.post(
     "/send-code",
+    dependencies=[Depends(send_code_ip_limit), Depends(send_code_email_limit)],
     status_code=status.HTTP_200_OK,
     summary="发送密码重置验证码",
     description="""
     #### 接口功能
-    - 向用户注册邮箱发送6位数字验证码
+    - 向用户注册邮箱发送6位数字验证码（写入发件箱后立即返回，由后台调度器投递）
     - 验证码有效期5分钟
-    - 同一邮箱60秒内只能发送一次验证码（防止恶意刷验证码）
+    - 同一邮箱60秒内只能发送一次验证码，同一IP10分钟内最多发送10次（防止恶意刷验证码）
     
     #### 校验规则
-    1. 邮箱格式校验（Pydantic自动完成）
-    2. 邮箱是否已注册
-    3. 发送频率限制（60秒内不可重复发送）
+    1. 发送频率限制（超出限制返回429，Retry-After为需等待的秒数）
+    2. 邮箱格式校验（Pydantic自动完成）
+    3. 邮箱是否已注册
     """,
 )
 async def send_verification_code(
@@ -57,74 +61,32 @@ async def send_verification_code(
     """发送密码重置验证码"""
     try:
         # 1. 校验邮箱是否已注册
-        statement = select(User).where(User.email == request.email)
-        user = (await session.exec(statement)).first()
+        # （过滤器判定一定未注册时不查库；否则只查主键，不加载整行）
+        user_id = None
+        if await account_might_exist(request.email):
+            statement = select(User.id).where(User.email == request.email)
+            user_id = (await session.exec(statement)).first()
 
-        if not user:
+        if user_id is None:
             # 为了安全，即使邮箱不存在也返回成功消息（防止邮箱枚举攻击）
             logger.warning(f"发送验证码失败：邮箱未注册，邮箱={request.email}")
             return {"message": "如果该邮箱已注册，验证码将发送到您的邮箱"}
 
-        # 2. 防刷校验：检查60秒内是否已发送验证码
-        one_minute_ago = datetime.now(ZoneInfo("Asia/Shanghai")) - timedelta(seconds=60)
-        recent_code_statement = (
-            select(VerificationCode)
-            .where(
-                VerificationCode.email == request.email,
-                VerificationCode.created_at >= one_minute_ago,
-                VerificationCode.code_type == "password_reset",
-            )
-            .order_by(VerificationCode.created_at.desc())
-        )
-        recent_code = (await session.exec(recent_code_statement)).first()
-
-        if recent_code:
-            created_at = recent_code.created_at
-
-            # 统一时区，不再报时区错误
-            if created_at.tzinfo is None:
-                created_at = created_at.replace(tzinfo=ZoneInfo("Asia/Shanghai"))
-
-            remaining_seconds = 60 - int(
-                (datetime.now(ZoneInfo("Asia/Shanghai")) - created_at).total_seconds()
-            )
-
-            if remaining_seconds > 0:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"验证码发送过于频繁，请{remaining_seconds}秒后再试",
-                )
-        # 3. 生成6位数字验证码
+        # 2. 生成6位数字验证码
         code = generate_verification_code()
 
-        # 4. 计算验证码过期时间（5分钟）
-        expires_at = datetime.now(ZoneInfo("Asia/Shanghai")) + timedelta(
-            minutes=settings.VERIFY_CODE_EXPIRE_MINUTES
-        )
-
-        # 5. 保存验证码到数据库
-        verification = VerificationCode(
-            email=request.email,
-            code=code,
-            expires_at=expires_at,
-            code_type="password_reset",
+        # 3. 保存验证码（有效期5分钟）
+        await get_verification_store().save(
+            session, request.email, "password_reset", code
         )
-        session.add(verification)
 
-        # 6. 发送验证码邮件
-        email_sent = email_service.send_verification_code(request.email, code)
-
-        if not email_sent:
-            # 邮件发送失败，回滚数据库操作
-            await session.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="验证码邮件发送失败，请稍后重试",
-            )
+        # 4. 验证码邮件写入发件箱（与验证码同一事务提交），由后台调度器发送
+        enqueue_email(session, request.email, "verification_code", {"code": code})
         await session.commit()
+        outbox_dispatcher.notify()
 
         logger.info(
-            f"验证码发送成功：邮箱={request.email}，验证码={code}（仅开发环境日志）"
+            f"验证码已加入发送队列：邮箱={request.email}，验证码={code}（仅开发环境日志）"
         )
 
         return {
@@ -159,9 +121,7 @@ async def send_verification_code(
     
     #### 校验规则
     1. 验证码格式校验（6位数字）
-    2. 验证码是否存在
-    3. 验证码是否已使用
-    4. 验证码是否过期
+    2. 验证码是否存在、是否已使用、是否过期（原子校验并作废，同一验证码只能成功验证一次）
     """,
 )
 async def verify_code(
@@ -176,65 +136,19 @@ async def verify_code(
                 detail="验证码格式错误，必须是6位数字",
             )
 
-        # 2. 查询验证码记录
-        statement = (
-            select(VerificationCode)
-            .where(
-                VerificationCode.email == request.email,
-                VerificationCode.code == request.code,
-                VerificationCode.code_type == "password_reset",
-                VerificationCode.is_used == False,
-                VerificationCode.expires_at
-                >= datetime.now(ZoneInfo("Asia/Shanghai")),  # 只查未过期的
-            )
-            .with_for_update()
+        # 2. 原子消费验证码：正确、未过期、未使用时作废并返回True
+        consumed = await get_verification_store().consume(
+            session, request.email, "password_reset", request.code
         )
-        verification = (await session.exec(statement)).first()
-
-        if not verification:
+        if not consumed:
             logger.warning(
-                f"验证码验证失败：验证码不存在或已使用，邮箱={request.email}，验证码={request.code}"
+                f"验证码验证失败：验证码错误、已过期或已使用，邮箱={request.email}，验证码={request.code}"
             )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="验证码错误或已失效"
             )
 
-        # 3. 验证码过期校验
-        now = datetime.now(ZoneInfo("Asia/Shanghai"))
-        expires_at = verification.expires_at
-        # 如果数据库取出的expires_at没有时区信息，默认设置为上海时区
-        if expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=ZoneInfo("Asia/Shanghai"))
-
-        if now > expires_at:
-            logger.warning(
-                f"验证码验证失败：验证码已过期，邮箱={request.email}，验证码={request.code}"
-            )
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="验证码已过期，请重新获取",
-            )
-
-        # 4. 标记验证码为已使用
-        update_stmt = (
-            update(VerificationCode)
-            .where(
-                VerificationCode.id == verification.id,
-                VerificationCode.is_used == False,  # 再次校验，防止并发修改
-            )
-            .values(is_used=True)
-        )
-        result = await session.exec(update_stmt)
-        await session.commit()
-        if result.rowcount == 0:
-            logger.warning(
-                f"验证码验证失败：验证码已被其他请求使用，邮箱={request.email}，验证码={request.code}"
-            )
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail="验证码已失效"
-            )
-
-        # 5. 生成重置密码令牌（JWT，有效期5分钟）
+        # 3. 生成重置密码令牌（JWT，有效期5分钟）
         reset_token = create_reset_token({"email": request.email, "type": "reset"})
 
         logger.info(f"验证码验证成功：邮箱={request.email}")
@@ -266,6 +180,7 @@ async def verify_code(
     description="""
     #### 接口功能
     - 使用重置令牌重置用户密码
+    - 吊销该用户的全部刷新令牌（已登录的设备无法再免密续期）
     - 密码重置成功后发送通知邮件
     
     #### 校验规则
@@ -308,34 +223,33 @@ async def reset_password(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="密码长度至少6个字符"
             )
 
-        # 3. 查询用户
-        statement = select(User).where(User.email == email)
-        user = (await session.exec(statement)).first()
+        # 3. 计算新密码哈希（在事务开始前完成，不在bcrypt计算期间持有行锁）
+        hashed_password = await hash_password_async(request.new_password)
 
-        if not user:
+        # 4. 单条条件UPDATE更新密码：不预先SELECT用户，影响行数为0说明用户不存在
+        result = await session.exec(
+            update(User)
+            .where(User.email == email)
+            .values(
+                hashed_password=hashed_password,
+                updated_at=datetime.now(ZoneInfo("Asia/Shanghai")),
+            )
+        )
+        if result.rowcount == 0:
+            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在"
             )
 
-        # 4. 更新用户密码
-        user.hashed_password = hash_password(request.new_password)
-        user.updated_at = datetime.now(ZoneInfo("Asia/Shanghai"))
+        # 5. 吊销该用户的全部刷新令牌（其他设备上的登录态无法再续期）
+        await revoke_refresh_tokens_by_email(session, email)
 
-        user_id = user.id
-        username = user.username
-
-        session.add(user)
+        # 6. 密码重置成功通知邮件写入发件箱（与密码更新同一事务提交），由后台调度器查询用户名后发送
+        enqueue_email(session, email, "password_reset_success", {})
         await session.commit()
+        outbox_dispatcher.notify()
 
-        # 5. 发送密码重置成功通知邮件（异步发送，失败不影响主流程）
-        try:
-            email_service.send_password_reset_success(email, username)
-        except Exception as e:
-            logger.warning(f"密码重置成功通知邮件发送失败：{str(e)}")
-
-        logger.info(
-            f"密码重置成功：用户ID={user_id}，用户名={username}，邮箱={email}"
-        )
+        logger.info(f"密码重置成功：邮箱={email}")
 
         return {"message": "密码重置成功，请使用新密码登录"}
 
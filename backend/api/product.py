@@ -3,9 +3,11 @@
 功能：提供商品的增删改查接口，支持分页查询
 """
 
-from typing import Annotated
-from fastapi import APIRouter, Depends, status, Query, HTTPException
-from sqlmodel import Session, select, func
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, status, Query, Header, HTTPException, Response
+from sqlmodel import Session, select, func, or_
+import base64
+import binascii
 import math
 import logging
 
@@ -13,19 +15,320 @@ from model.product import Product
 from schemas.products.product import (
     ProductResponse,
     ProductListResponse,
+    SparseProductListResponse,
 )
 from database import get_session
+from config import settings
+from utils.catalogCache import (
+    CachedPage,
+    catalog_page_key,
+    get_catalog_page,
+    product_count_cache,
+    product_count_key,
+    store_catalog_page,
+)
+from utils.compression import negotiate_encoding
+from utils.httpCache import etag_matches
+from utils.searchIndex import SearchCandidates, product_search_index
+from utils.serializer import dumps, rows_to_dicts
+from utils.staticAssets import asset_url
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["products"])
 
+# 商品列表查询的列（与ProductResponse字段一一对应），按列查询得到行元组后直接组装为字典
+PRODUCT_COLUMNS = tuple(ProductResponse.model_fields)
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """
+    解析fields参数（逗号分隔的字段名），返回按PRODUCT_COLUMNS顺序排列的字段元组
+    id总是包含在内（游标分页依赖）；未传或包含全部字段时返回None（即返回全部字段）
+    :raises HTTPException: 包含不支持的字段时返回400
+    """
+    if fields is None or not fields.strip():
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(PRODUCT_COLUMNS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "field": "fields",
+                "message": f"不支持的字段：{','.join(sorted(unknown))}，"
+                f"可选字段：{','.join(PRODUCT_COLUMNS)}",
+            },
+        )
+    requested.add("id")
+    # 按固定顺序规范化，字段顺序不同的请求共用同一份缓存
+    columns = tuple(column for column in PRODUCT_COLUMNS if column in requested)
+    return None if columns == PRODUCT_COLUMNS else columns
+
+
+def encode_cursor(last_id: int) -> str:
+    """将当前页最后一条商品ID编码为不透明游标（URL安全Base64，去除填充）"""
+    raw = f"v1:{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    解析游标，返回上一页最后一条商品ID
+    :raises HTTPException: 游标格式非法时返回400
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        version, _, last_id = base64.urlsafe_b64decode(padded).decode().partition(":")
+        if version != "v1" or not last_id.isdigit():
+            raise ValueError(cursor)
+        return int(last_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"field": "cursor", "message": "分页游标无效"},
+        )
+
+
+def catalog_cache_control() -> str:
+    """商品列表响应的Cache-Control头（允许浏览器/CDN缓存，过期后可先返回旧内容再后台重新验证）"""
+    directives = ["public", f"max-age={settings.CATALOG_HTTP_MAX_AGE}"]
+    if settings.CATALOG_HTTP_STALE_WHILE_REVALIDATE > 0:
+        directives.append(
+            f"stale-while-revalidate={settings.CATALOG_HTTP_STALE_WHILE_REVALIDATE}"
+        )
+    return ", ".join(directives)
+
+
+def catalog_response(
+    cached_page: CachedPage, if_none_match: str | None, accept_encoding: str | None
+) -> Response:
+    """
+    根据ETag返回304或完整响应，统一附加缓存相关响应头
+    客户端支持压缩时直接返回缓存条目上的压缩响应体（已带Content-Encoding，压缩中间件不再处理）
+    """
+    body, etag = cached_page.body, cached_page.etag
+    headers = {"Cache-Control": catalog_cache_control(), "Vary": "Accept-Encoding"}
+    encoding = None
+    # 未启用列表缓存时压缩结果无法复用，交给压缩中间件处理
+    if (
+        settings.COMPRESSION_ENABLED
+        and settings.CATALOG_CACHE_ENABLED
+        and len(body) >= settings.COMPRESSION_MIN_BYTES
+    ):
+        encoding = negotiate_encoding(accept_encoding)
+    if encoding is not None:
+        etag = cached_page.encoded_etag(encoding)
+        headers["Content-Encoding"] = encoding
+    headers["ETag"] = etag
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding is not None:
+        body = cached_page.encoded_body(encoding)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def search_candidate_ids(search: str | None) -> SearchCandidates | None:
+    """
+    通过进程内搜索索引将关键词转换为候选商品ID
+    :return: 候选结果；无搜索条件、索引未就绪或候选过多时返回None（直接使用LIKE查询）
+    """
+    if not (search and search.strip()) or not settings.SEARCH_INDEX_ENABLED:
+        return None
+    candidates = product_search_index.search(search)
+    if candidates is not None and len(candidates.ids) > settings.SEARCH_INDEX_MAX_CANDIDATES:
+        return None
+    return candidates
+
+
+def apply_product_filters(
+    statement,
+    category: str | None,
+    search: str | None,
+    candidates: SearchCandidates | None = None,
+):
+    """为商品查询/计数语句追加统一的筛选条件（分类、名称搜索、仅有库存）"""
+    # 如果有分类筛选
+    if category:
+        statement = statement.where(Product.category == category)
+
+    # 搜索索引给出的候选主键：数据库走主键查找，仅对候选行复核下方的LIKE条件；
+    # 索引尚未收录的商品（其他worker新增，ID大于max_indexed_id）按主键范围交给LIKE条件判断
+    if candidates is not None:
+        unindexed = Product.id > candidates.max_indexed_id
+        if candidates.ids:
+            statement = statement.where(
+                or_(Product.id.in_(sorted(candidates.ids)), unindexed)
+            )
+        else:
+            statement = statement.where(unindexed)
+
+    # 名称模糊搜索（不区分大小写，适配PostgreSQL/MySQL）
+    if search and search.strip():
+        # MySQL 用 like，PostgreSQL 用 ilike
+        pattern = f"%{search.strip()}%"
+        if settings.SEARCH_INCLUDE_DESCRIPTION:
+            statement = statement.where(
+                or_(Product.name.like(pattern), Product.description.like(pattern))
+            )
+        else:
+            statement = statement.where(Product.name.like(pattern))
+
+    # 只显示有库存的商品
+    return statement.where(Product.in_stock == True)
+
+
+async def count_products(
+    session: Session,
+    category: str | None,
+    search: str | None,
+    count_mode: str,
+    candidates: SearchCandidates | None = None,
+) -> int | None:
+    """
+    统计符合筛选条件的商品总数
+    :param count_mode: exact-精确值（优先读缓存，未命中时执行COUNT并写入缓存）；
+                       estimated-近似值（允许使用已过期的缓存值，无缓存时执行COUNT并写入缓存）；
+                       none-不统计，返回None
+    """
+    if count_mode == "none":
+        return None
+
+    cache_key = product_count_key(category, search)
+    total = product_count_cache.get(cache_key)
+    if total is not None:
+        return total
+
+    if count_mode == "estimated":
+        # 不使用表统计信息（information_schema.TABLES.TABLE_ROWS）：它统计全部行，
+        # 不区分是否有库存，有缺货商品时总数和总页数都会偏大
+        total = product_count_cache.get_stale(cache_key)
+        if total is not None:
+            return total
+
+    count_statement = apply_product_filters(
+        select(func.count(Product.id)), category, search, candidates
+    )
+    total = await session.scalar(count_statement) or 0
+    product_count_cache.set(cache_key, total)
+    return total
+
+
+async def query_product_page(
+    session: Session,
+    page: int,
+    page_size: int,
+    category: str | None,
+    search: str | None,
+    after_id: int | None,
+    count: str,
+    columns: tuple[str, ...] | None = None,
+) -> dict:
+    """
+    查询一页商品数据（after_id不为None时使用游标分页，否则使用页码分页）
+    返回与ProductListResponse结构一致的字典，可直接序列化为JSON（数据库列类型即响应字段类型，无需再校验）
+    columns为需要返回的字段（第一列必须为id，见parse_fields），None表示全部字段
+    """
+    columns = columns or PRODUCT_COLUMNS
+    keyset_mode = after_id is not None
+
+    # 搜索关键词先经过进程内索引转换为候选ID
+    # 已收录的商品中无匹配时，数据库只需按主键范围检查索引尚未收录的新商品
+    candidates = search_candidate_ids(search)
+
+    # 构建查询语句
+    # 只查询响应需要的列，结果为行元组，不构建ORM对象
+    statement = apply_product_filters(
+        select(*(getattr(Product, column) for column in columns)),
+        category,
+        search,
+        candidates,
+    )
+    if search and search.strip():
+        logger.debug(
+            f"添加名称搜索条件：{search.strip()}，索引候选数：{None if candidates is None else len(candidates.ids)}"
+        )  # 调试日志：记录搜索关键词
+
+    # 按id排列（游标分页依赖id严格递增的顺序）
+    statement = statement.order_by(Product.id.asc())
+    # statement = statement.order_by(Product.id.desc())
+
+    # 获取总数（按count参数决定精确/近似/跳过）
+    total = await count_products(session, category, search, count, candidates)
+    logger.debug(f"符合条件的商品总数：{total}")  # 调试日志：记录总数
+
+    # 计算总页数
+    if total is None:
+        total_pages = None
+    else:
+        total_pages = math.ceil(total / page_size) if total > 0 else 1
+
+    # 两种模式都多取1条，用于判断是否还有下一页（不依赖总数）
+    if keyset_mode:
+        # 游标分页：按主键定位
+        statement = statement.where(Product.id > after_id).limit(page_size + 1)
+        logger.debug(f"游标分页参数 - after_id：{after_id}, 每页数量：{page_size}")
+    else:
+        # 页码分页
+        offset = (page - 1) * page_size
+        statement = statement.offset(offset).limit(page_size + 1)
+        logger.debug(
+            f"分页参数 - 偏移量：{offset}, 每页数量：{page_size}"
+        )  # 调试日志：记录分页参数
+
+    # 执行分页查询语句，获取当前页商品的行元组列表（列顺序同columns，第一列为id）
+    rows = (await session.exec(statement)).all()
+
+    # 计算下一页游标（页码模式同样返回，便于客户端随时切换到游标模式）
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(rows[-1][0]) if rows and has_more else None
+    logger.debug(f"当前页查询到的商品数量：{len(rows)}")  # 调试日志：记录当前页商品数量
+
+    # 行元组直接按列名组装为字典：跳过ORM实例构建、model_dump和ProductResponse校验
+    products = rows_to_dicts(columns, rows)
+    if "image_url" in columns:
+        # 图片地址解析为带内容指纹的URL，浏览器可按immutable长期缓存
+        for product in products:
+            product["image_url"] = asset_url(product["image_url"])
+    # 记录查询成功日志
+    logger.info(
+        f"商品列表查询成功 - 总数量：{total}，总页数：{total_pages}，当前页返回数量：{len(products)}"
+    )
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "products": products,
+        "next_cursor": next_cursor,
+    }
+
 
 @router.get(
     "/products",
-    response_model=ProductListResponse,
+    response_model=ProductListResponse | SparseProductListResponse,
     status_code=status.HTTP_200_OK,
     summary="获取商品列表（分页）接口",
-    description="获取所有商品列表，支持分页查询",
+    description="""
+    #### 接口功能
+    - 获取所有有库存的商品列表，支持分类筛选、名称搜索
+    #### 分页模式
+    1. 页码模式（默认）：传入page/page_size，适用于带页码跳转的分页控件
+    2. 游标模式：传入cursor（上一页返回的next_cursor）或after_id（首页传0），
+       按 id > 上一页最后ID 定位，深分页不再扫描并丢弃偏移量之前的所有行
+    #### 总数统计（count参数）
+    - exact（默认）：精确总数，结果按筛选条件缓存
+    - estimated：允许近似总数（使用已过期的缓存总数；从未统计过的筛选条件仍执行一次精确统计）
+    - none：不统计总数，total/total_pages返回null，适用于无限滚动，是否有下一页以next_cursor为准
+    #### 返回字段（fields参数）
+    - 逗号分隔的字段名，如fields=id,name,price,image_url，只查询并返回这些列（id总是返回）
+    - 不传时返回全部字段；包含不支持的字段返回400
+    #### HTTP缓存
+    - 响应携带由内容计算的强ETag和Cache-Control头
+    - 请求头If-None-Match与当前ETag一致时返回304（无响应体）
+    - 按Accept-Encoding返回压缩后的响应（压缩结果随列表缓存复用，不同编码的ETag不同）
+    """,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "内容未变化"}},
 )
 async def get_products(
     session: Annotated[Session, Depends(get_session)],
@@ -33,87 +336,58 @@ async def get_products(
     page_size: Annotated[int, Query(ge=1, le=100, description="每页数量，最大100")] = 6,
     category: Annotated[str | None, Query(description="商品分类筛选")] = None,
     search: Annotated[str | None, Query(description="商品名称模糊搜索关键词")] = None,
+    cursor: Annotated[
+        str | None, Query(description="游标分页：上一页响应中的next_cursor")
+    ] = None,
+    after_id: Annotated[
+        int | None, Query(ge=0, description="游标分页：从该商品ID之后开始，首页传0")
+    ] = None,
+    count: Annotated[
+        Literal["exact", "estimated", "none"],
+        Query(description="总数统计方式：exact-精确，estimated-近似，none-不统计"),
+    ] = "exact",
+    fields: Annotated[
+        str | None,
+        Query(
+            description="返回字段，逗号分隔（如id,name,price,image_url），不传返回全部字段"
+        ),
+    ] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    accept_encoding: Annotated[str | None, Header()] = None,
 ):
     try:
         """获取商品列表（带分页）"""
         logger.info(
-            f"开始查询商品列表 - 页码：{page}，每页数量：{page_size}，分类：{category}，搜索关键词：{search}"
+            f"开始查询商品列表 - 页码：{page}，每页数量：{page_size}，分类：{category}，搜索关键词：{search}，游标：{cursor}，after_id：{after_id}"
         )
-        # 构建查询语句
-        statement = select(Product)
-
-        # 如果有分类筛选
-        if category:
-            statement = statement.where(Product.category == category)
-
-        # 名称模糊搜索（不区分大小写，适配PostgreSQL/MySQL）
-        if search and search.strip():
-            # MySQL 用 like，PostgreSQL 用 ilike
-            statement = statement.where(Product.name.like(f"%{search.strip()}%"))
-            logger.debug(
-                f"添加名称搜索条件：{search.strip()}"
-            )  # 调试日志：记录搜索关键词
-
-        # 只显示有库存的商品
-        statement = statement.where(Product.in_stock == True)
-
-        # 按id排列
-        statement = statement.order_by(Product.id.asc())
-        # statement = statement.order_by(Product.id.desc())
-
-        # 获取总数
-        count_statement = select(func.count(Product.id))
-        if category:
-            count_statement = count_statement.where(Product.category == category)
-
-        if search and search.strip():
-            count_statement = count_statement.where(
-                Product.name.like(f"%{search.strip()}%")
-            )
+        # 游标优先于after_id；两者都未传时使用页码模式
+        if cursor is not None:
+            after_id = decode_cursor(cursor)
+        columns = parse_fields(fields)
 
-        count_statement = count_statement.where(Product.in_stock == True)
-        total = await session.scalar(count_statement) or 0
-        logger.debug(f"符合条件的商品总数：{total}")  # 调试日志：记录总数
-
-        # 计算总页数
-        total_pages = math.ceil(total / page_size) if total > 0 else 1
-
-        # 分页查询
-        offset = (page - 1) * page_size
-        statement = statement.offset(offset).limit(page_size)
-        logger.debug(
-            f"分页参数 - 偏移量：{offset}, 每页数量：{page_size}"
-        )  # 调试日志：记录分页参数
-
-        # 执行分页查询语句，获取当前页的商品数据库模型列表
-        # session.exec(statement) 执行构造好的SQL查询，返回结果集对象
-        # .all() 将结果集转换为包含Product（数据库模型）实例的列表
-        products = (await session.exec(statement)).all()
-        logger.debug(
-            f"当前页查询到的商品数量：{len(products)}"
-        )  # 调试日志：记录当前页商品数量
-
-        # 将数据库模型列表转换为响应模型列表（核心：类型适配+数据校验）
-        # 遍历每一个数据库查询得到的Product实例，逐个转换为对外输出的ProductResponse响应模型
-        # model_validate：Pydantic v2核心方法，自动校验数据并完成模型转换，确保输出格式符合接口定义
-        product_response = [
-            ProductResponse.model_validate(product.model_dump()) for product in products
-        ]  # 转换为响应模型列表
-        # 记录查询成功日志
-        logger.info(
-            f"商品列表查询成功 - 总数量：{total}，总页数：{total_pages}，当前页返回数量：{len(product_response)}"
+        # 读穿缓存：命中时直接返回预序列化的JSON字节，跳过数据库查询与Pydantic序列化
+        cache_key = catalog_page_key(
+            page, page_size, category, search, after_id, count, columns
         )
-        return ProductListResponse(
-            total=total,
-            page=page,
-            page_size=page_size,
-            total_pages=total_pages,
-            products=product_response,
+        if settings.CATALOG_CACHE_ENABLED:
+            cached_page = await get_catalog_page(cache_key)
+            if cached_page is not None:
+                logger.debug(f"商品列表缓存命中：{cache_key}")
+                return catalog_response(cached_page, if_none_match, accept_encoding)
+
+        product_page = await query_product_page(
+            session, page, page_size, category, search, after_id, count, columns
         )
+        body = dumps(product_page)
+        if settings.CATALOG_CACHE_ENABLED:
+            cached_page = await store_catalog_page(cache_key, body)
+        else:
+            cached_page = CachedPage.from_body(body)
+        return catalog_response(cached_page, if_none_match, accept_encoding)
     # 异常处理+日志记录
     except HTTPException:
         # 主动抛出的HTTP异常（如参数校验失败），直接向上抛出
-        session.rollback()  # 回滚数据库事务，确保数据一致性
+        await session.rollback()  # 回滚数据库事务，确保数据一致性
         raise
     except Exception as e:
         # 未知异常：记录错误日志（包含详细堆栈），并返回500错误
@@ -2,9 +2,12 @@ from schemas.user.userRegister import UserRegister
 from schemas.user.userResponse import UserResponse
 from model.user import User
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import select, Session, or_  # or_ 用于合并查询
+from sqlmodel import Session
+from sqlalchemy.exc import IntegrityError  # 唯一约束冲突异常
 from database import get_session
-from utils.hashPassword import hash_password
+from utils.hashPassword import hash_password_async
+from utils.rateLimit import register_ip_limit
+from utils.userFilter import add_account
 from typing import Annotated
 from pydantic import ValidationError  # 捕获Pydantic校验异常
 import logging  # 日志记录
@@ -14,9 +17,38 @@ logger = logging.getLogger(__name__)
 # 创建路由器
 router = APIRouter(tags=["register"])
 
+# 唯一约束冲突字段 → 结构化错误信息
+DUPLICATE_FIELD_ERRORS = {
+    "username": {"field": "username", "message": "用户名已被注册"},
+    "email": {"field": "email", "message": "邮箱已被注册"},
+}
+
+
+def duplicate_field(error: IntegrityError) -> str | None:
+    """
+    从唯一约束冲突异常中识别冲突字段，无法识别时返回None
+    MySQL：(1062, "Duplicate entry 'xxx' for key 'users.ix_users_username'")（8.0.19之前的版本键名不带表名）
+    SQLite：UNIQUE constraint failed: users.username
+    只解析键名/列名并精确比较：错误信息中包含冲突的值，值里恰好出现其他字段名时不能误判
+    """
+    message = str(error.orig)
+    if "for key '" in message:
+        # 冲突的值在键名之前，取最后一次出现的位置
+        key = message.rsplit("for key '", 1)[1].split("'", 1)[0]
+        key = key.removeprefix(f"{User.__tablename__}.")
+    elif "failed: " in message:
+        key = message.split("failed: ", 1)[1].strip()
+    else:
+        return None
+    for field in DUPLICATE_FIELD_ERRORS:
+        if key in (f"ix_{User.__tablename__}_{field}", f"{User.__tablename__}.{field}"):
+            return field
+    return None
+
 
 @router.post(
     "/register",
+    dependencies=[Depends(register_ip_limit)],
     response_model=UserResponse,
     status_code=status.HTTP_201_CREATED,
     summary="用户注册接口",
@@ -24,9 +56,10 @@ router = APIRouter(tags=["register"])
     #### 接口功能
     - 提供用户注册服务，完成用户账号的创建
     - 校验规则：
-      1. 用户名/邮箱唯一性校验
+      1. 用户名/邮箱唯一性校验（由数据库唯一索引保证，冲突时返回对应字段的错误）
       2. 用户名/密码/邮箱格式由Pydantic模型(UserRegister)前置校验
       3. 密码加密存储（bcrypt算法）
+      4. 按IP限流，超出限制返回429（Retry-After为需等待的秒数）
     - 入参说明:
     - username: 3-10位，仅含字母、数字、下划线、中文
     - email: 合法邮箱格式
@@ -38,46 +71,43 @@ async def register(
     user_data: UserRegister, session: Annotated[Session, Depends(get_session)]
 ):
     try:
-        # ========== 1. 唯一性校验（优化：封装函数，结构化错误） ==========
-        # 构造查询：同时校验用户名和邮箱是否存在
-        statement = select(User).where(
-            or_(User.username == user_data.username, User.email == user_data.email)
-        )
-        existing_user = (await session.exec(statement)).first()
-
-        # 判断是否存在重复，并区分是用户名还是邮箱
-        if existing_user:
-            if existing_user.username == user_data.username:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail={"field": "username", "message": "用户名已被注册"},
-                )
-            else:  # 邮箱重复
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail={"field": "email", "message": "邮箱已被注册"},
-                )
-
-        # ========== 2. 安全处理：显式忽略repassword（仅用password加密） ==========
+        # ========== 1. 安全处理：显式忽略repassword（仅用password加密） ==========
         # repassword仅用于前端+Pydantic校验一致性，后端无需存储
         logger.info(f"用户注册：用户名={user_data.username}，邮箱={user_data.email}")
 
-        # ========== 3. 创建新用户（密码加密存储） ==========
+        # ========== 2. 创建新用户（密码加密存储） ==========
         new_user = User(
             username=user_data.username,
             email=user_data.email,
-            hashed_password=hash_password(user_data.password),  # 仅password加密
+            hashed_password=await hash_password_async(user_data.password),  # 仅password加密
         )
 
-        # ========== 4. 数据库操作（增加异常捕获） ==========
+        # ========== 3. 直接插入，由唯一索引保证用户名/邮箱唯一 ==========
+        # 不再预先SELECT：一次往返完成注册，并发注册同名用户时也只有一个能成功；
+        # 提交后无需refresh，id在插入时回填，其余字段均由应用侧生成
         session.add(new_user)
-        await session.commit()
-        await session.refresh(new_user)  # 刷新获取数据库生成的字段（如id）
+        try:
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            field = duplicate_field(e)
+            if field is None:
+                raise
+            logger.warning(
+                f"用户注册失败：{field}已存在，用户名={user_data.username}，邮箱={user_data.email}"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=DUPLICATE_FIELD_ERRORS[field],
+            )
+
+        # 新账号加入用户存在性过滤器（登录、可用性检查据此判断账号是否存在）
+        await add_account(new_user.username, new_user.email)
 
         logger.info(f"用户注册成功：用户名={user_data.username}，用户ID={new_user.id}")
         return new_user
 
-    # ========== 5. 异常处理（分类捕获，友好提示） ==========
+    # ========== 4. 异常处理（分类捕获，友好提示） ==========
     except HTTPException:
         # 业务异常（用户名/邮箱已存在），直接抛出
         raise
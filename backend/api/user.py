@@ -0,0 +1,80 @@
+"""
+当前用户API路由
+功能：提供当前登录用户信息接口、用户名/邮箱可用性检查接口
+鉴权：通过get_current_user依赖校验访问令牌，令牌与用户信息均有进程内缓存，命中时不访问数据库
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import Session, select
+
+from database import get_session
+from model.user import User
+from schemas.user.userAvailability import AvailabilityResponse
+from schemas.user.userResponse import UserResponse
+from utils.currentUser import get_current_user
+from utils.rateLimit import availability_ip_limit
+from utils.userFilter import account_might_exist
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+@router.get(
+    "/me",
+    response_model=UserResponse,
+    status_code=status.HTTP_200_OK,
+    summary="获取当前登录用户信息",
+    description="""
+    #### 接口功能
+    - 根据请求头Authorization: Bearer <token>返回当前登录用户的公开信息
+    #### 校验规则
+    1. 令牌缺失、无效或已过期返回401
+    2. 账户已禁用返回403
+    """,
+)
+async def read_current_user(
+    current_user: Annotated[UserResponse, Depends(get_current_user)],
+):
+    return current_user
+
+
+@router.get(
+    "/availability",
+    response_model=AvailabilityResponse,
+    dependencies=[Depends(availability_ip_limit)],
+    status_code=status.HTTP_200_OK,
+    summary="检查用户名/邮箱是否可注册",
+    description="""
+    #### 接口功能
+    - 注册表单实时校验用户名、邮箱是否已被占用（可只传其中一个）
+    - 用户存在性过滤器判定一定未被占用时直接返回，不访问数据库
+    #### 校验规则
+    1. 至少传入username或email之一
+    2. 按IP限流，超出限制返回429
+    """,
+)
+async def check_availability(
+    session: Annotated[Session, Depends(get_session)],
+    username: Annotated[str | None, Query(max_length=50)] = None,
+    email: Annotated[str | None, Query(max_length=100)] = None,
+):
+    if not username and not email:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"field": "username", "message": "请提供用户名或邮箱"},
+        )
+
+    result = AvailabilityResponse()
+    for field, value, column in (
+        ("username", username, User.username),
+        ("email", email, User.email),
+    ):
+        if not value:
+            continue
+        if not await account_might_exist(value):
+            setattr(result, field, True)
+            continue
+        existing = (await session.exec(select(User.id).where(column == value))).first()
+        setattr(result, field, existing is None)
+    return result
@@ -0,0 +1,203 @@
+"""
+基准测试公共夹具
+功能：
+    1. configure_environment：设置基准测试环境变量（本地SQLite数据库、关闭限流、固定密钥等）
+    2. seed_database：重建数据库并写入固定的商品和用户数据（随机种子固定，每次运行数据完全一致）；
+       product_records同时为微基准测试提供相同的商品数据
+    3. install_stub_smtp：将邮件服务的SMTP连接替换为内存模拟连接，邮件投递到内存收件箱（可模拟网络延迟）
+说明：config在导入时读取环境变量，configure_environment必须在导入任何应用模块之前调用，
+     因此本模块顶层只导入标准库，应用模块在函数内部导入
+"""
+
+import asyncio
+import os
+import random
+import re
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+from email.message import Message
+from pathlib import Path
+
+# 默认基准测试数据库（每次运行前删除重建）
+DEFAULT_DATABASE_PATH = Path(tempfile.gettempdir()) / "fruitsync-benchmark.db"
+# 种子用户的统一密码（只计算一次bcrypt哈希，所有种子用户共用）
+BENCHMARK_PASSWORD = "bench-pass-123"
+# 随机种子（商品价格、分类等数据固定）
+SEED = 20240601
+
+# 基准测试环境变量（优先级高于.env文件）
+BENCHMARK_ENV = {
+    "ENVIRONMENT": "development",
+    # 固定密钥：令牌内容与长度稳定，也避免开发环境每次启动打印随机密钥
+    "SECRET_KEY": "fruitsync-benchmark-secret-key-0123456789abcdef",
+    # 压测中同一IP、同一账号会发出大量请求，开启限流后测到的只是429
+    "RATE_LIMIT_ENABLED": "false",
+    "STATE_BACKEND": "memory",
+    # 不连接真实SMTP服务器（见install_stub_smtp）
+    "SMTP_HOST": "",
+    "DB_ECHO": "false",
+}
+
+# 商品基础数据：(名称, 图片文件, 分类)
+FRUITS = [
+    ("苹果", "apple.jpg", "仁果类"),
+    ("香蕉", "banana.jpg", "热带水果"),
+    ("菠萝", "boluo.jpg", "热带水果"),
+    ("草莓", "caomei.jpg", "浆果类"),
+    ("车厘子", "chelizi.jpg", "核果类"),
+    ("橙子", "chengzi.jpg", "柑橘类"),
+    ("橘子", "juzi.jpg", "柑橘类"),
+    ("蓝莓", "lanmei.jpg", "浆果类"),
+    ("芒果", "mangguo.jpg", "热带水果"),
+    ("猕猴桃", "mihoutao.jpg", "浆果类"),
+    ("葡萄", "putao.jpg", "浆果类"),
+    ("青枣", "qingzao.jpg", "核果类"),
+    ("西瓜", "xigua.jpg", "瓜果类"),
+]
+GRADES = ["精选", "特级", "有机", "进口", "当季", "礼盒装"]
+# 浏览场景使用的分类与搜索关键词
+CATEGORIES = sorted({category for _, _, category in FRUITS})
+SEARCH_TERMS = [name for name, _, _ in FRUITS]
+
+
+def configure_environment(database_url: str | None = None) -> str:
+    """
+    设置基准测试环境变量（必须在导入config之前调用）
+    :param database_url: 数据库连接URL，默认使用临时目录下的SQLite文件
+    :return: 实际使用的数据库连接URL
+    """
+    database_url = database_url or f"sqlite+aiosqlite:///{DEFAULT_DATABASE_PATH}"
+    os.environ.update(BENCHMARK_ENV)
+    os.environ["DB_URL"] = database_url
+    return database_url
+
+
+def user_credentials(index: int) -> tuple[str, str]:
+    """第index个种子用户的(用户名, 邮箱)"""
+    return f"bench{index}", f"bench{index}@example.com"
+
+
+def product_records(count: int) -> list[dict]:
+    """固定的商品数据（字段同Product表，不含主键；同样的count每次生成的数据完全一致）"""
+    rng = random.Random(SEED)
+    created_at = datetime(2024, 6, 1, 8, 0, 0)
+    records = []
+    for index in range(count):
+        name, image, category = FRUITS[index % len(FRUITS)]
+        grade = GRADES[(index // len(FRUITS)) % len(GRADES)]
+        records.append(
+            {
+                "name": f"{grade}{name}{index // (len(FRUITS) * len(GRADES)) or ''}",
+                "description": f"{grade}{name}，产地直发，新鲜采摘",
+                "price": round(rng.uniform(3, 200), 2),
+                "image_url": f"/images/{image}",
+                "category": category,
+                "in_stock": rng.random() > 0.1,
+                "created_at": created_at + timedelta(minutes=index),
+            }
+        )
+    return records
+
+
+async def seed_database(products: int, users: int) -> None:
+    """重建数据库表并写入固定数据（SQLite数据库先删除文件）"""
+    from sqlmodel import SQLModel
+
+    import main  # noqa: F401  导入全部模型，create_all才会建出所有表
+    from config import settings
+    from database import AsyncSessionFactory, async_engine
+    from model.product import Product
+    from model.user import User
+    from utils.hashPassword import hash_password
+
+    if settings.DATABASE_URL.startswith("sqlite"):
+        Path(settings.DATABASE_URL.split("///", 1)[1]).unlink(missing_ok=True)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    hashed_password = hash_password(BENCHMARK_PASSWORD)
+    async with AsyncSessionFactory() as session:
+        session.add_all(Product(**record) for record in product_records(products))
+        for index in range(users):
+            username, email = user_credentials(index)
+            session.add(
+                User(username=username, email=email, hashed_password=hashed_password)
+            )
+        await session.commit()
+
+
+class Mailbox:
+    """内存收件箱：保存模拟SMTP投递的邮件，并提取验证码"""
+
+    CODE_PATTERN = re.compile(r'class="code">\s*(\d{6})\s*<')
+
+    def __init__(self):
+        self.delivered = 0
+        self._codes: dict[str, list[str]] = defaultdict(list)
+        self._condition = asyncio.Condition()
+
+    async def deliver(self, message: Message) -> None:
+        self.delivered += 1
+        for part in message.walk():
+            if part.get_content_type() != "text/html":
+                continue
+            match = self.CODE_PATTERN.search(part.get_payload(decode=True).decode())
+            if match:
+                async with self._condition:
+                    self._codes[message["To"]].append(match.group(1))
+                    self._condition.notify_all()
+
+    async def next_code(self, email: str, timeout: float = 10) -> str:
+        """等待并取出发给email的下一个验证码"""
+        async with self._condition:
+            await asyncio.wait_for(
+                self._condition.wait_for(lambda: self._codes[email]), timeout
+            )
+            return self._codes[email].pop(0)
+
+
+class StubSMTPClient:
+    """模拟SMTP连接（只实现SMTPConnectionPool用到的方法），发送邮件时等待latency秒后投递到收件箱"""
+
+    def __init__(self, mailbox: Mailbox, latency: float):
+        self.mailbox = mailbox
+        self.latency = latency
+        self.is_connected = True
+
+    async def send_message(self, message: Message) -> None:
+        await asyncio.sleep(self.latency)
+        await self.mailbox.deliver(message)
+
+    async def noop(self) -> None:
+        await asyncio.sleep(self.latency)
+
+    async def quit(self) -> None:
+        self.is_connected = False
+
+    def close(self) -> None:
+        self.is_connected = False
+
+
+def install_stub_smtp(latency: float = 0.05) -> Mailbox:
+    """
+    替换邮件服务的SMTP连接池（连接池本身的借还、健康检查逻辑照常执行）
+    :param latency: 模拟的单次SMTP往返耗时（秒），建立连接按3次往返计算（连接、STARTTLS、AUTH）
+    :return: 收件箱
+    """
+    from config import settings
+    from utils.emailService import email_service
+    from utils.smtpPool import SMTPConnectionPool
+
+    mailbox = Mailbox()
+
+    class StubSMTPConnectionPool(SMTPConnectionPool):
+        async def _connect(self) -> StubSMTPClient:
+            await asyncio.sleep(latency * 3)
+            return StubSMTPClient(mailbox, latency)
+
+    email_service.pool = StubSMTPConnectionPool(
+        host="stub", port=0, username="", password="", size=settings.SMTP_POOL_SIZE
+    )
+    return mailbox
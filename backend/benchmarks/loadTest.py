@@ -0,0 +1,418 @@
+"""
+API负载基准测试
+功能：在进程内启动FastAPI应用（httpx.ASGITransport，不经过网络栈），连接写入固定数据的本地数据库，
+     按脚本并发执行以下场景，统计每个场景及各接口的吞吐量（RPS）和延迟分位数（p50/p95/p99）：
+    1. browse：商品列表浏览（页码分页、游标翻页、分类筛选、搜索）
+    2. login：登录风暴（种子账号集中登录，每10次中1次密码错误）
+    3. register：注册突发（新用户集中注册）
+    4. reset：密码重置流程（发送验证码 → 从模拟SMTP收件箱取验证码 → 校验 → 重置密码）
+使用（在backend目录下执行）：
+    python -m benchmarks.loadTest                                  # 全部场景，结果保存到benchmarks/results/
+    python -m benchmarks.loadTest --scenarios browse login -c 50 -n 2000
+    python -m benchmarks.loadTest --compare benchmarks/results/基线.json  # 与基线对比，退化超过阈值时退出码为1
+说明：进程内测试衡量的是应用自身（路由、序列化、数据库访问、bcrypt等）的开销，不含uvicorn和网络；
+     不同机器上的结果不可直接比较，对比应在同一台机器、相同参数下进行
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import logging
+import math
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fixtures import (
+    BENCHMARK_PASSWORD,
+    CATEGORIES,
+    SEARCH_TERMS,
+    Mailbox,
+    configure_environment,
+    install_stub_smtp,
+    seed_database,
+    user_credentials,
+)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+# 报告中的延迟分位数
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """最近秩法分位数（sorted_values需已排序）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    """延迟统计（毫秒）"""
+    values = sorted(latencies)
+    summary = {f"p{q}": round(percentile(values, q) * 1000, 3) for q in PERCENTILES}
+    summary["mean"] = round(sum(values) / len(values) * 1000, 3) if values else 0.0
+    summary["max"] = round(values[-1] * 1000, 3) if values else 0.0
+    return summary
+
+
+class Recorder:
+    """记录单个场景中每个接口的延迟和状态码"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+        self.enabled = True  # 预热期间不记录
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        name: str,
+        method: str,
+        url: str,
+        expected: tuple[int, ...] = (200,),
+        **kwargs,
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        if self.enabled:
+            self.observe(name, time.perf_counter() - start)
+            self.statuses[name][response.status_code] += 1
+            if response.status_code not in expected:
+                self.errors[name] += 1
+        return response
+
+    def observe(self, name: str, elapsed: float) -> None:
+        """记录一次耗时（也用于记录多步流程的端到端耗时）"""
+        if self.enabled:
+            self.latencies[name].append(elapsed)
+
+
+class Scenarios:
+    """负载场景：每个场景方法执行一次完整的用户操作，index为全局递增的迭代序号"""
+
+    def __init__(self, client: httpx.AsyncClient, mailbox: Mailbox, users: int):
+        self.client = client
+        self.mailbox = mailbox
+        self.users = users
+        self._new_users = itertools.count()
+
+    async def browse(self, recorder: Recorder, index: int) -> None:
+        """浏览商品：首页 → 游标连续翻三页 → 分类筛选 → 搜索"""
+        request = recorder.request
+        await request(self.client, "products:page", "GET", "/products?page=1&page_size=6")
+        url = "/products?after_id=0&page_size=12&count=none"
+        for _ in range(3):
+            response = await request(self.client, "products:cursor", "GET", url)
+            next_cursor = response.json().get("next_cursor")
+            if not next_cursor:
+                break
+            url = f"/products?cursor={next_cursor}&page_size=12&count=none"
+        category = CATEGORIES[index % len(CATEGORIES)]
+        await request(
+            self.client,
+            "products:category",
+            "GET",
+            "/products",
+            params={"category": category, "page": index % 3 + 1, "page_size": 6},
+        )
+        await request(
+            self.client,
+            "products:search",
+            "GET",
+            "/products",
+            params={"search": SEARCH_TERMS[index % len(SEARCH_TERMS)], "page_size": 6},
+        )
+
+    async def login(self, recorder: Recorder, index: int) -> None:
+        """登录：轮流使用种子账号，每10次中1次密码错误"""
+        username, _ = user_credentials(index % self.users)
+        wrong = index % 10 == 9
+        await recorder.request(
+            self.client,
+            "login:failure" if wrong else "login:success",
+            "POST",
+            "/login",
+            expected=(401,) if wrong else (200,),
+            json={
+                "username": username,
+                "password": "wrong-password" if wrong else BENCHMARK_PASSWORD,
+            },
+        )
+
+    async def register(self, recorder: Recorder, index: int) -> None:
+        """注册新用户（用户名3-10位）"""
+        number = next(self._new_users)
+        await recorder.request(
+            self.client,
+            "register",
+            "POST",
+            "/register",
+            expected=(201,),
+            json={
+                "username": f"new{number:07d}",
+                "email": f"new{number}@example.com",
+                "password": BENCHMARK_PASSWORD,
+                "repassword": BENCHMARK_PASSWORD,
+            },
+        )
+
+    async def reset(self, recorder: Recorder, index: int) -> None:
+        """密码重置：新密码与原密码相同，不影响登录场景使用的种子账号"""
+        _, email = user_credentials(index % self.users)
+        start = time.perf_counter()
+        await recorder.request(
+            self.client, "reset:send-code", "POST", "/password/send-code", json={"email": email}
+        )
+        # 验证码由发件箱调度器异步投递到模拟SMTP
+        code = await self.mailbox.next_code(email)
+        recorder.observe("reset:mail-delivery", time.perf_counter() - start)
+        response = await recorder.request(
+            self.client,
+            "reset:verify-code",
+            "POST",
+            "/password/verify-code",
+            json={"email": email, "code": code},
+        )
+        await recorder.request(
+            self.client,
+            "reset:reset",
+            "POST",
+            "/password/reset",
+            json={"token": response.json()["reset_token"], "new_password": BENCHMARK_PASSWORD},
+        )
+        recorder.observe("reset:flow", time.perf_counter() - start)
+
+
+SCENARIOS = ("browse", "login", "register", "reset")
+
+
+async def run_scenario(
+    scenarios: Scenarios, name: str, concurrency: int, iterations: int, warmup: int
+) -> dict:
+    """以concurrency个并发用户执行iterations次场景（先执行warmup次不计入结果）"""
+    scenario = getattr(scenarios, name)
+    recorder = Recorder()
+    counter = itertools.count()
+    failures = Counter()
+
+    async def virtual_user(limit: int) -> None:
+        while (index := next(counter)) < limit:
+            try:
+                await scenario(recorder, index)
+            except Exception as e:
+                # 场景内的异常（如收件箱等待超时）计为失败，不中断其他虚拟用户
+                failures[type(e).__name__] += 1
+
+    if warmup:
+        recorder.enabled = False
+        await asyncio.gather(*(virtual_user(warmup) for _ in range(concurrency)))
+        recorder.enabled = True
+        counter = itertools.count(warmup)
+        failures.clear()
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(virtual_user(warmup + iterations) for _ in range(concurrency))
+    )
+    duration = time.perf_counter() - start
+
+    requests = sum(
+        sum(statuses.values()) for statuses in recorder.statuses.values()
+    )
+    all_latencies = list(
+        itertools.chain.from_iterable(
+            recorder.latencies[endpoint] for endpoint in recorder.statuses
+        )
+    )
+    return {
+        "iterations": iterations,
+        "requests": requests,
+        "errors": sum(recorder.errors.values()) + sum(failures.values()),
+        "failures": dict(failures),
+        "duration_seconds": round(duration, 3),
+        "rps": round(requests / duration, 2) if duration else 0.0,
+        "iterations_per_second": round(iterations / duration, 2) if duration else 0.0,
+        "latency_ms": latency_summary(all_latencies),
+        "endpoints": {
+            endpoint: {
+                "requests": len(latencies),
+                "errors": recorder.errors[endpoint],
+                "statuses": {
+                    str(code): count
+                    for code, count in sorted(recorder.statuses[endpoint].items())
+                },
+                "latency_ms": latency_summary(latencies),
+            }
+            for endpoint, latencies in sorted(recorder.latencies.items())
+        },
+    }
+
+
+async def run_benchmarks(args: argparse.Namespace) -> dict:
+    """初始化数据库和应用，依次执行各场景"""
+    # config在导入时读取环境变量，应用模块需在configure_environment之后导入
+    app_module = importlib.import_module("main")
+
+    await seed_database(products=args.products, users=args.users)
+    mailbox = install_stub_smtp(latency=args.smtp_latency)
+    results = {}
+    async with app_module.lifespan(app_module.app):
+        # 与生产环境一致只输出WARNING及以上日志（开发环境的逐请求INFO日志会显著拖慢吞吐）
+        logging.getLogger().setLevel(logging.WARNING)
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", timeout=60
+        ) as client:
+            scenarios = Scenarios(client, mailbox, args.users)
+            for name in args.scenarios:
+                print(f"运行场景：{name}（并发={args.concurrency}，迭代={args.iterations}）")
+                results[name] = await run_scenario(
+                    scenarios, name, args.concurrency, args.iterations, args.warmup
+                )
+    return results
+
+
+def git_revision() -> dict:
+    """当前代码版本（不在git仓库中时为unknown）"""
+    def git(*command: str) -> str:
+        try:
+            return subprocess.run(
+                ["git", *command], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or "unknown",
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def print_report(results: dict) -> None:
+    header = f"{'场景/接口':<24}{'请求数':>8}{'错误':>6}{'RPS':>10}" + "".join(
+        f"{f'p{q}(ms)':>11}" for q in PERCENTILES
+    )
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<24}{result['requests']:>8}{result['errors']:>6}{result['rps']:>10.1f}"
+            + "".join(f"{latency[f'p{q}']:>11.2f}" for q in PERCENTILES)
+        )
+        for endpoint, stats in result["endpoints"].items():
+            latency = stats["latency_ms"]
+            print(
+                f"  {endpoint:<22}{stats['requests']:>8}{stats['errors']:>6}{'':>10}"
+                + "".join(f"{latency[f'p{q}']:>11.2f}" for q in PERCENTILES)
+            )
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    与基线结果对比并打印变化，返回退化项
+    退化：RPS下降或p95延迟上升超过threshold（相对比例）
+    """
+    regressions = []
+    print(f"\n与基线对比（基线版本：{baseline['meta']['git']['commit']}）")
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            print(f"{name:<12}基线中没有该场景")
+            continue
+        rps_change = result["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        base_p95, p95 = base["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        p95_change = p95 / base_p95 - 1 if base_p95 else 0.0
+        flags = []
+        if rps_change < -threshold:
+            flags.append("RPS退化")
+        if p95_change > threshold:
+            flags.append("p95退化")
+        print(
+            f"{name:<12}RPS {base['rps']:.1f} → {result['rps']:.1f}（{rps_change:+.1%}）  "
+            f"p95 {base_p95:.2f} → {p95:.2f}ms（{p95_change:+.1%}）  {' '.join(flags)}"
+        )
+        regressions.extend(f"{name}: {flag}" for flag in flags)
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="FruitSync API负载基准测试")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="执行的场景"
+    )
+    parser.add_argument("-c", "--concurrency", type=int, default=20, help="并发虚拟用户数")
+    parser.add_argument("-n", "--iterations", type=int, default=200, help="每个场景的迭代次数")
+    parser.add_argument("--warmup", type=int, default=50, help="每个场景的预热迭代次数（不计入结果）")
+    parser.add_argument("--products", type=int, default=500, help="种子商品数")
+    parser.add_argument("--users", type=int, default=200, help="种子用户数（应不小于并发数）")
+    parser.add_argument(
+        "--smtp-latency", type=float, default=0.05, help="模拟SMTP单次往返耗时（秒）"
+    )
+    parser.add_argument(
+        "--database-url", help="数据库连接URL（默认临时目录下的SQLite文件，运行前会清空）"
+    )
+    parser.add_argument("-o", "--output", type=Path, help="结果JSON文件路径（默认benchmarks/results/）")
+    parser.add_argument("--compare", type=Path, help="与该基线结果JSON对比")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="对比时判定退化的相对变化比例"
+    )
+    args = parser.parse_args()
+    if args.users < args.concurrency:
+        parser.error("种子用户数不能小于并发数（并发的重置流程会互相消费验证码）")
+    return args
+
+
+def cli() -> int:
+    args = parse_args()
+    database_url = configure_environment(args.database_url)
+    started_at = datetime.now()
+    scenarios = asyncio.run(run_benchmarks(args))
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "git": revision,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": database_url.split("@")[-1],
+            "options": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "compare", "database_url")
+            },
+        },
+        "scenarios": scenarios,
+    }
+    print()
+    print_report(scenarios)
+
+    output = args.output or RESULTS_DIR / (
+        f"load-{started_at:%Y%m%d-%H%M%S}-{revision['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n结果已保存：{output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n性能退化（阈值{args.threshold:.0%}）：" + "；".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
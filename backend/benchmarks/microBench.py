@@ -0,0 +1,221 @@
+"""
+热点函数微基准测试
+功能：单独测量请求链路上的热点函数，每项给出单次调用耗时（微秒）：
+    1. 密码：hash_password / verify_password（bcrypt）
+    2. 令牌：create_access_token / create_reset_token
+    3. 校验：UserRegister校验器（合法数据、用户名不合法、两次密码不一致）
+    4. 商品列表序列化（6/50/100条）：Pydantic模型校验 + model_dump_json，与接口实际使用的行元组 + orjson路径对比
+    结果与microThresholds.json中的上限对比，超出上限时退出码为1；也可与之前保存的结果对比相对变化
+使用（在backend目录下执行）：
+    python -m benchmarks.microBench                         # 全部用例，结果保存到benchmarks/results/
+    python -m benchmarks.microBench --filter token product  # 只运行名称包含token或product的用例
+    python -m benchmarks.microBench --compare benchmarks/results/基线.json
+说明：每个用例先自动确定单轮调用次数（单轮至少0.2秒），再重复多轮取最小值（受系统噪声影响最小）和中位数；
+     阈值上限按开发机实测值留有约3倍余量，只用于发现数量级上的退化，细微变化请用--compare在同一台机器上对比
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.fixtures import BENCHMARK_PASSWORD, configure_environment, product_records
+from benchmarks.loadTest import RESULTS_DIR, git_revision
+
+THRESHOLDS_FILE = Path(__file__).parent / "microThresholds.json"
+# 商品列表序列化用例的页大小（首页宫格、常规分页、接口允许的最大页）
+PAGE_SIZES = (6, 50, 100)
+
+
+def build_cases() -> dict[str, Callable[[], object]]:
+    """构建基准用例：名称 → 无参可调用对象（应用模块需在configure_environment之后导入）"""
+    from fastapi import HTTPException
+    from pydantic import ValidationError
+
+    from api.product import PRODUCT_COLUMNS
+    from schemas.products.product import ProductListResponse
+    from schemas.user.userRegister import UserRegister
+    from utils.hashPassword import hash_password, verify_password
+    from utils.serializer import dumps, rows_to_dicts
+    from utils.token import create_access_token, create_reset_token
+
+    hashed_password = hash_password(BENCHMARK_PASSWORD)
+    register_payloads = {
+        "valid": {
+            "username": "bench_user",
+            "email": "bench_user@example.com",
+            "password": BENCHMARK_PASSWORD,
+            "repassword": BENCHMARK_PASSWORD,
+        },
+        "invalid_username": {
+            "username": "bad name!",
+            "email": "bench_user@example.com",
+            "password": BENCHMARK_PASSWORD,
+            "repassword": BENCHMARK_PASSWORD,
+        },
+        "password_mismatch": {
+            "username": "bench_user",
+            "email": "bench_user@example.com",
+            "password": BENCHMARK_PASSWORD,
+            "repassword": "another-password",
+        },
+    }
+
+    def validate_register(payload: dict) -> Callable[[], object]:
+        def run():
+            try:
+                return UserRegister(**payload)
+            except (HTTPException, ValidationError) as e:
+                return e
+
+        return run
+
+    cases = {
+        "hash_password": lambda: hash_password(BENCHMARK_PASSWORD),
+        "verify_password": lambda: verify_password(BENCHMARK_PASSWORD, hashed_password),
+        "create_access_token": lambda: create_access_token(
+            {"sub": "bench_user", "user_id": 1}
+        ),
+        "create_reset_token": lambda: create_reset_token(
+            {"email": "bench_user@example.com", "type": "reset"}
+        ),
+        **{
+            f"user_register:{name}": validate_register(payload)
+            for name, payload in register_payloads.items()
+        },
+    }
+
+    columns = PRODUCT_COLUMNS
+    records = product_records(max(PAGE_SIZES))
+    for size in PAGE_SIZES:
+        # 与数据库返回的行元组相同的结构（列顺序同PRODUCT_COLUMNS）
+        rows = [
+            tuple({"id": index + 1, **record}[column] for column in columns)
+            for index, record in enumerate(records[:size])
+        ]
+        page = {"total": 500, "page": 1, "page_size": size, "total_pages": 500 // size + 1}
+
+        def pydantic_path(rows=rows, page=page):
+            products = rows_to_dicts(columns, rows)
+            return ProductListResponse(**page, products=products).model_dump_json()
+
+        def rows_path(rows=rows, page=page):
+            return dumps({**page, "products": rows_to_dicts(columns, rows), "next_cursor": None})
+
+        cases[f"product_list:pydantic:{size}"] = pydantic_path
+        cases[f"product_list:rows:{size}"] = rows_path
+    return cases
+
+
+def measure(function: Callable[[], object], repeat: int) -> dict:
+    """测量单次调用耗时（微秒）"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    timings = [total / number * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_us": round(min(timings), 3),
+        "median_us": round(statistics.median(timings), 3),
+    }
+
+
+def check_thresholds(results: dict, thresholds: dict[str, float]) -> list[str]:
+    """以最小值对比阈值上限，返回超出上限的用例"""
+    exceeded = []
+    for name, result in results.items():
+        limit = thresholds.get(name)
+        if limit is not None and result["min_us"] > limit:
+            exceeded.append(f"{name}: {result['min_us']:.1f}us > {limit:.1f}us")
+    return exceeded
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    """与基线结果对比最小值的相对变化，返回变慢超过threshold的用例"""
+    regressions = []
+    print(f"\n与基线对比（基线版本：{baseline['meta']['git']['commit']}）")
+    for name, result in results.items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        change = result["min_us"] / base["min_us"] - 1
+        flag = "退化" if change > threshold else ""
+        print(
+            f"{name:<34}{base['min_us']:>12.2f} → {result['min_us']:>12.2f}us（{change:+.1%}） {flag}"
+        )
+        if flag:
+            regressions.append(f"{name}: {change:+.1%}")
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="FruitSync热点函数微基准测试")
+    parser.add_argument("--filter", nargs="+", help="只运行名称包含任一关键字的用例")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复的轮数")
+    parser.add_argument("-o", "--output", type=Path, help="结果JSON文件路径（默认benchmarks/results/）")
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS_FILE, help="阈值上限文件")
+    parser.add_argument("--compare", type=Path, help="与该基线结果JSON对比")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="对比时判定退化的相对变化比例"
+    )
+    return parser.parse_args()
+
+
+def cli() -> int:
+    args = parse_args()
+    configure_environment()
+    started_at = datetime.now()
+    cases = build_cases()
+    if args.filter:
+        cases = {
+            name: case
+            for name, case in cases.items()
+            if any(keyword in name for keyword in args.filter)
+        }
+
+    print(f"{'用例':<34}{'min(us)':>12}{'median(us)':>12}{'次数/轮':>10}")
+    results = {}
+    for name, case in cases.items():
+        results[name] = result = measure(case, args.repeat)
+        print(
+            f"{name:<34}{result['min_us']:>12.2f}{result['median_us']:>12.2f}{result['number']:>10}"
+        )
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "git": revision,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "cases": results,
+    }
+    output = args.output or RESULTS_DIR / (
+        f"micro-{started_at:%Y%m%d-%H%M%S}-{revision['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n结果已保存：{output}")
+
+    failures = []
+    if args.thresholds.is_file():
+        thresholds = json.loads(args.thresholds.read_text(encoding="utf-8"))
+        failures += check_thresholds(results, thresholds["max_us"])
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        failures += compare(baseline, results, args.threshold)
+    if failures:
+        print("\n性能退化：\n  " + "\n  ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
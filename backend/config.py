@@ -1,6 +1,8 @@
 """应用配置模块"""
 
+import os
 from enum import Enum
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -36,11 +38,25 @@ class Settings(BaseSettings):
     PROD_DB_PASSWORD: str = Field(default="", description="生产数据库密码")
     PROD_DB_NAME: str = Field(default="", description="生产数据库名称")
 
+    # 完整连接URL（设置后优先于上面的主机/端口配置，如基准测试使用的sqlite+aiosqlite:///bench.db）
+    DB_URL: str = Field(default="", description="完整数据库连接URL，为空时按环境拼接")
+
     # 数据库连接池配置
     DB_POOL_SIZE: int = Field(default=5, description="连接池大小")
     DB_MAX_OVERFLOW: int = Field(default=10, description="连接池最大溢出")
     DB_ECHO: bool = Field(default=False, description="是否打印SQL语句")
 
+    # SQL耗时统计：按请求累计查询次数和数据库耗时（响应头Server-Timing + 日志），记录慢查询
+    SQL_TIMING_ENABLED: bool = Field(
+        default=True, description="是否按请求统计SQL次数和耗时（Server-Timing响应头）"
+    )
+    SLOW_QUERY_MS: float = Field(
+        default=200, description="慢查询阈值（毫秒），单条SQL超过该耗时记录警告日志，0表示不记录"
+    )
+    REQUEST_QUERY_WARN_COUNT: int = Field(
+        default=20, description="单个请求SQL次数超过该值时记录警告日志（排查N+1查询），0表示不记录"
+    )
+
     # ==================== JWT配置 ====================
     # JWT核心配置项（基于Pydantic Field定义，用于配置校验和文档生成）
     # 核心密钥，生产环境必须配置高强度随机字符串（建议32位以上），切勿泄露
@@ -51,6 +67,23 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_HOURS: int = Field(
         default=6, description="访问令牌过期时间(小时)"
     )
+    # 刷新令牌有效期：访问令牌过期后凭刷新令牌续期（无需再次输入密码），每次使用后轮换
+    REFRESH_TOKEN_EXPIRE_DAYS: int = Field(
+        default=30, description="刷新令牌过期时间(天)"
+    )
+    REFRESH_TOKEN_CLEANUP_SECONDS: int = Field(
+        default=3600, description="过期刷新令牌定期清理间隔（秒），0表示不清理"
+    )
+    # 登录态校验缓存：已验证的访问令牌缓存至过期，用户信息快照短时间缓存，避免每次请求查库
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = Field(
+        default=10000, description="已验证访问令牌缓存最大条目数"
+    )
+    AUTH_USER_CACHE_TTL_SECONDS: int = Field(
+        default=30, description="当前用户信息快照缓存过期时间（秒）"
+    )
+    AUTH_USER_CACHE_MAX_ENTRIES: int = Field(
+        default=10000, description="当前用户信息快照缓存最大条目数"
+    )
     # 重置密码令牌有效期，敏感操作令牌建议设置短有效期，降低泄露风险
     RESET_TOKEN_EXPIRE_MINUTES: int = Field(
         default=5, description="重置密码令牌过期时间(分钟)"
@@ -60,6 +93,64 @@ class Settings(BaseSettings):
     VERIFY_CODE_EXPIRE_MINUTES: int = Field(
         default=5, description="验证码过期时间（分钟）"
     )
+    # 验证码存储：kv-共享状态存储（随TTL自动过期），sql-verification_codes数据表，
+    # auto-STATE_BACKEND=redis时使用kv，否则使用sql（内存状态存储下其他worker读不到本worker保存的验证码）
+    VERIFY_CODE_STORE: Literal["auto", "kv", "sql"] = Field(
+        default="auto", description="验证码存储后端"
+    )
+
+    # ==================== 密码哈希配置 ====================
+    # bcrypt计算放到独立的线程池/进程池执行，排队任务超过上限时快速返回503
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = Field(
+        default="thread", description="bcrypt计算池类型"
+    )
+    PASSWORD_HASH_WORKERS: int = Field(
+        default=os.cpu_count() or 1, description="bcrypt计算池工作线程/进程数"
+    )
+    PASSWORD_HASH_MAX_PENDING: int = Field(
+        default=64, description="bcrypt计算池最大未完成任务数（含排队）"
+    )
+
+    # ==================== 用户存在性过滤器配置 ====================
+    # 布隆过滤器记录已注册的用户名/邮箱，登录和可用性检查遇到一定不存在的账号时不查库
+    # 只在STATE_BACKEND=redis时生效（内存状态存储下各worker的位图互不可见，会把其他worker注册的账号误判为不存在）
+    USER_FILTER_ENABLED: bool = Field(default=True, description="是否启用用户存在性过滤器")
+    USER_FILTER_CAPACITY: int = Field(
+        default=1_000_000, description="过滤器预期账号数（用户名和邮箱分别计数）"
+    )
+    USER_FILTER_ERROR_RATE: float = Field(
+        default=0.01, description="过滤器误判率（误判时照常查库）"
+    )
+    USER_FILTER_REFRESH_SECONDS: int = Field(
+        default=3600, description="过滤器定期全量重建间隔（秒），0表示不重建"
+    )
+
+    # ==================== 限流配置 ====================
+    # 令牌桶限流规则，格式"次数/秒数"，如"5/60"表示60秒内最多5次
+    RATE_LIMIT_ENABLED: bool = Field(default=True, description="是否启用接口限流")
+    LOGIN_RATE_LIMIT_PER_IP: str = Field(
+        default="30/60", description="登录接口每个IP的限流规则"
+    )
+    LOGIN_RATE_LIMIT_PER_ACCOUNT: str = Field(
+        default="5/60", description="登录接口每个账号的限流规则"
+    )
+    REGISTER_RATE_LIMIT_PER_IP: str = Field(
+        default="5/600", description="注册接口每个IP的限流规则"
+    )
+    SEND_CODE_RATE_LIMIT_PER_EMAIL: str = Field(
+        default="1/60", description="发送验证码接口每个邮箱的限流规则"
+    )
+    SEND_CODE_RATE_LIMIT_PER_IP: str = Field(
+        default="10/600", description="发送验证码接口每个IP的限流规则"
+    )
+    AVAILABILITY_RATE_LIMIT_PER_IP: str = Field(
+        default="30/60", description="用户名/邮箱可用性检查接口每个IP的限流规则"
+    )
+    # 反向代理部署时直连的对端地址是代理地址，只有来自这些地址的请求才读取X-Forwarded-For确定客户端IP
+    # 为空表示不信任任何代理（直接对外提供服务时不能信任该请求头，客户端可以任意伪造）
+    TRUSTED_PROXIES: list[str] = Field(
+        default=[], description="可信反向代理的IP或网段（CIDR）列表"
+    )
 
     # ==================== 应用配置 ====================
     APP_TITLE: str = Field(default="水果API", description="应用标题")
@@ -77,6 +168,86 @@ class Settings(BaseSettings):
 
     # ==================== 静态文件配置 ====================
     STATIC_DIR: str = Field(default="static/images", description="静态文件目录")
+    # 商品图片变体：/images/{name}?w=320&fmt=webp 按需缩放、转码并缓存到磁盘（需要安装Pillow）
+    IMAGE_VARIANT_WIDTHS: list[int] = Field(
+        default=[160, 320, 640, 960],
+        description="允许请求的图片宽度（其他宽度返回400，避免任意尺寸撑满缓存）",
+    )
+    IMAGE_VARIANT_QUALITY: int = Field(default=80, description="图片变体编码质量（1-100）")
+    IMAGE_CACHE_DIR: str = Field(default="cache/images", description="图片变体磁盘缓存目录")
+    IMAGE_CACHE_MAX_BYTES: int = Field(
+        default=256 * 1024 * 1024, description="图片变体磁盘缓存最大总字节数（超出按LRU淘汰）"
+    )
+    IMAGE_WORKERS: int = Field(default=2, description="图片缩放/编码线程数")
+    # 静态资源指纹：启动时按内容哈希生成带指纹的文件名，指纹URL按immutable长期缓存
+    STATIC_FINGERPRINT_ENABLED: bool = Field(
+        default=True, description="商品列表是否返回带内容指纹的图片URL"
+    )
+    STATIC_PRECOMPRESS_DIR: str = Field(
+        default="cache/static", description="静态资源预压缩文件（gzip/brotli）目录"
+    )
+
+    # ==================== 缓存配置 ====================
+    # 商品总数缓存：相同筛选条件的COUNT结果在有效期内复用
+    PRODUCT_COUNT_CACHE_TTL_SECONDS: int = Field(
+        default=60, description="商品总数缓存过期时间（秒）"
+    )
+    PRODUCT_COUNT_CACHE_MAX_ENTRIES: int = Field(
+        default=1024, description="商品总数缓存最大条目数"
+    )
+    # 商品列表响应缓存：缓存整页响应的JSON字节，命中时不访问数据库
+    CATALOG_CACHE_ENABLED: bool = Field(default=True, description="是否启用商品列表缓存")
+    CATALOG_CACHE_TTL_SECONDS: int = Field(
+        default=30, description="商品列表缓存过期时间（秒）"
+    )
+    CATALOG_CACHE_MAX_ENTRIES: int = Field(
+        default=2048, description="商品列表缓存最大条目数"
+    )
+    CATALOG_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024, description="商品列表缓存最大占用字节数"
+    )
+    # 商品列表HTTP缓存头：浏览器/CDN可直接复用响应，过期后凭ETag重新验证
+    CATALOG_HTTP_MAX_AGE: int = Field(
+        default=30, description="商品列表Cache-Control的max-age（秒）"
+    )
+    CATALOG_HTTP_STALE_WHILE_REVALIDATE: int = Field(
+        default=60,
+        description="商品列表Cache-Control的stale-while-revalidate（秒），0表示不设置",
+    )
+
+    # ==================== 监控指标配置 ====================
+    # /metrics以Prometheus文本格式输出请求量、耗时、连接池等指标（应只允许内网/监控系统访问）
+    METRICS_ENABLED: bool = Field(default=True, description="是否启用/metrics监控指标")
+
+    # ==================== 响应压缩配置 ====================
+    # 按Accept-Encoding压缩响应（zstd/brotli需安装对应可选依赖，否则只使用gzip）
+    COMPRESSION_ENABLED: bool = Field(default=True, description="是否启用响应压缩")
+    COMPRESSION_MIN_BYTES: int = Field(
+        default=1024, description="响应体小于该字节数时不压缩（压缩收益抵不上开销）"
+    )
+    COMPRESSION_CONTENT_TYPES: list[str] = Field(
+        default=[
+            "text/",
+            "application/json",
+            "application/javascript",
+            "application/xml",
+            "image/svg+xml",
+        ],
+        description="需要压缩的内容类型（前缀匹配）",
+    )
+
+    # ==================== 商品搜索配置 ====================
+    # 进程内N-gram倒排索引：将名称搜索转换为主键候选集合，避免LIKE前导通配符全表扫描
+    SEARCH_INDEX_ENABLED: bool = Field(default=True, description="是否启用商品搜索索引")
+    SEARCH_INCLUDE_DESCRIPTION: bool = Field(
+        default=False, description="商品搜索是否同时匹配商品描述"
+    )
+    SEARCH_INDEX_MAX_CANDIDATES: int = Field(
+        default=2000, description="候选ID超过该数量时回退为LIKE查询"
+    )
+    SEARCH_INDEX_REFRESH_SECONDS: int = Field(
+        default=300, description="搜索索引定期全量重建间隔（秒），0表示不重建"
+    )
 
     # ==================== 邮件配置（可选） ====================
     SMTP_HOST: str = Field(default="", description="SMTP服务器主机")
@@ -84,12 +255,34 @@ class Settings(BaseSettings):
     SMTP_USER: str = Field(default="", description="SMTP用户名")
     SMTP_PASSWORD: str = Field(default="", description="SMTP密码")
     EMAIL_FROM: str = Field(default="", description="发件人邮箱")
+    SMTP_START_TLS: bool = Field(default=True, description="连接后是否执行STARTTLS")
+    # SMTP连接池：复用已完成TLS握手和登录的长连接
+    SMTP_POOL_SIZE: int = Field(default=2, description="SMTP连接池最大连接数")
+    SMTP_TIMEOUT: float = Field(default=10, description="SMTP连接/命令超时时间（秒）")
+    SMTP_IDLE_CHECK_SECONDS: float = Field(
+        default=30, description="连接空闲超过该时长后复用前先做NOOP健康检查（秒）"
+    )
+    # 邮件发件箱调度器：后台批量投递email_outbox中的邮件
+    OUTBOX_BATCH_SIZE: int = Field(default=20, description="发件箱每批领取的邮件数")
+    OUTBOX_POLL_SECONDS: float = Field(default=5, description="发件箱轮询间隔（秒）")
+    OUTBOX_MAX_ATTEMPTS: int = Field(default=5, description="单封邮件最大尝试次数")
+    OUTBOX_RETRY_BASE_SECONDS: float = Field(
+        default=10, description="发送失败重试的基础退避间隔（秒），按次数指数增长"
+    )
+    OUTBOX_LEASE_SECONDS: int = Field(
+        default=120, description="领取后的租约时长（秒），到期未回写状态则重新投递"
+    )
 
     # ==================== Redis配置（可选） ====================
+    # 共享状态存储：memory-进程内（单worker有效），redis-多worker/多副本共享
+    STATE_BACKEND: Literal["memory", "redis"] = Field(
+        default="memory", description="共享状态存储后端"
+    )
     REDIS_HOST: str = Field(default="localhost", description="Redis主机")
     REDIS_PORT: int = Field(default=6379, description="Redis端口")
     REDIS_PASSWORD: str = Field(default="", description="Redis密码")
     REDIS_DB: int = Field(default=0, description="Redis数据库编号")
+    REDIS_KEY_PREFIX: str = Field(default="fruitsync:", description="Redis键前缀")
 
     #  V1写法：用 model_config 替代 Config 类
     # class Config:
@@ -106,7 +299,9 @@ class Settings(BaseSettings):
     # ==================== 动态属性 ====================
     @property
     def DATABASE_URL(self) -> str:
-        """根据环境返回对应的数据库连接字符串"""
+        """根据环境返回对应的数据库连接字符串（设置了DB_URL时直接使用）"""
+        if self.DB_URL:
+            return self.DB_URL
         if self.ENVIRONMENT == Environment.PRODUCTION:
             return (
                 f"mysql+aiomysql://{self.PROD_DB_USER}:{self.PROD_DB_PASSWORD}"
@@ -4,12 +4,24 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 # 导入SQLModel异步会话类（SQLModel对SQLAlchemy AsyncSession的封装）
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+# 导入SQLAlchemy事件机制（用于统计SQL次数和耗时）
+from sqlalchemy import event
+
 # 导入项目配置（数据库连接信息、连接池参数等）
 from config import settings
 
+# 导入指标工具（连接池状态在/metrics被抓取时读取）
+from utils.metrics import CallbackMetric, Histogram
+
 # 导入Python标准日志模块（用于记录数据库错误）
 import logging
 
+# 导入SQL统计所需的标准库（上下文变量、计时、语句归一化）
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
 # 初始化日志器（logger名称为当前模块名，便于日志溯源）
 logger = logging.getLogger(__name__)
 
@@ -30,6 +42,100 @@ async_engine = create_async_engine(
     pool_recycle=3600,
 )
 
+# ==================== 连接池指标 ====================
+def _pool_samples(state: str):
+    """读取连接池状态（QueuePool才有这些统计，SQLite内存库等使用的其他连接池返回空）"""
+    pool = async_engine.sync_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return []
+    value = {
+        "size": pool.size,
+        "checked_out": pool.checkedout,
+        "checked_in": pool.checkedin,
+        "overflow": pool.overflow,
+    }[state]()
+    return [((), value)]
+
+
+CallbackMetric("db_pool_size", "数据库连接池常驻连接数", lambda: _pool_samples("size"))
+CallbackMetric(
+    "db_pool_checked_out", "数据库连接池已借出的连接数", lambda: _pool_samples("checked_out")
+)
+CallbackMetric(
+    "db_pool_checked_in", "数据库连接池空闲的连接数", lambda: _pool_samples("checked_in")
+)
+CallbackMetric(
+    "db_pool_overflow",
+    "数据库连接池溢出连接数（超出pool_size的临时连接，为负表示常驻连接尚未全部建立）",
+    lambda: _pool_samples("overflow"),
+)
+
+# ==================== SQL耗时统计 ====================
+@dataclass
+class QueryStats:
+    """单个请求的SQL统计（由请求中间件创建并放入上下文变量）"""
+
+    count: int = 0  # SQL执行次数
+    duration: float = 0.0  # 数据库耗时合计（秒）
+
+
+# 当前请求的SQL统计（请求之外执行的SQL，如后台任务，不计入任何请求）
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds",
+    "单条SQL执行耗时（秒）",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# 语句归一化：字符串/数字字面量替换为?，IN列表折叠，去除多余空白（同一类查询归为同一条日志，且不输出参数值）
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """归一化SQL语句，用于慢查询日志"""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _IN_LIST.sub("IN (...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 同一连接上可能嵌套执行（如预检测ping），用栈保存开始时间
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    db_query_duration_seconds.observe(elapsed)
+    # 异步引擎在greenlet中执行同步事件，SQLAlchemy会沿用调用方协程的上下文，可以读取到当前请求的统计对象
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+    if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        # 不输出参数值（可能包含邮箱、密码哈希等敏感数据）
+        logger.warning(
+            f"慢查询：耗时={elapsed * 1000:.1f}ms，"
+            f"批量={executemany}，SQL={normalize_statement(statement)}"
+        )
+
+
+@event.listens_for(async_engine.sync_engine, "handle_error")
+def _handle_error(exception_context):
+    # 执行失败的语句不会触发after_cursor_execute，弹出其开始时间，避免连接归还连接池后栈持续增长、计时错位
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
 # 创建异步会话工厂（SQLAlchemy核心组件，生成会话对象）
 # 作用：封装会话创建规则，所有会话都通过该工厂生成，保证一致性
 AsyncSessionFactory = async_sessionmaker(
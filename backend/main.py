@@ -3,16 +3,32 @@ from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager  # 用于管理应用生命周期
 from sqlmodel import SQLModel
-from database import async_engine
+from database import async_engine, AsyncSessionFactory
 from fastapi.staticfiles import StaticFiles
 from api.register import router as register
 from api.login import router as login
 from api.product import router as product
 from api.passwordReset import router as passwordReset
+from api.user import router as user
+from api.image import router as image
 from config import settings  # 配置系统
 import logging
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from utils.searchIndex import rebuild_product_search_index, run_search_index_refresher
+from utils.stateBackend import close_state_backend
+from utils.userFilter import rebuild_user_filter, run_user_filter_refresher
+from utils.refreshToken import run_refresh_token_cleaner
+from utils.hashPassword import shutdown_hash_executor
+from utils.imageVariants import shutdown_image_executor
+from utils.staticAssets import build_static_manifest
+from utils.emailService import email_service
+from utils.outboxDispatcher import outbox_dispatcher
+from utils.serializer import FastJSONResponse
+from utils.compression import CompressionMiddleware
+from utils.serverTiming import ServerTimingMiddleware
+from utils.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import asyncio
 
 # 配置日志
 logging.basicConfig(
@@ -37,6 +53,53 @@ async def lifespan(app: FastAPI):
 
         logger.info("✅ 应用启动成功，数据库表已创建")
 
+        # 构建静态资源指纹清单（需在商品列表缓存写入前完成；失败时图片URL不带指纹）
+        try:
+            await asyncio.to_thread(build_static_manifest)
+        except Exception as e:
+            logger.warning(f"⚠️ 静态资源清单构建失败，图片将使用原始URL: {e}")
+
+        # 构建商品搜索索引（失败不影响启动，搜索自动回退为LIKE查询）
+        search_index_task = None
+        if settings.SEARCH_INDEX_ENABLED:
+            try:
+                await rebuild_product_search_index(AsyncSessionFactory)
+            except Exception as e:
+                logger.warning(f"⚠️ 商品搜索索引构建失败，搜索将回退为LIKE查询: {e}")
+            if settings.SEARCH_INDEX_REFRESH_SECONDS > 0:
+                search_index_task = asyncio.create_task(
+                    run_search_index_refresher(
+                        AsyncSessionFactory, settings.SEARCH_INDEX_REFRESH_SECONDS
+                    )
+                )
+
+        # 构建用户存在性过滤器（失败不影响启动，登录和可用性检查照常查库）
+        user_filter_task = None
+        if settings.USER_FILTER_ENABLED:
+            try:
+                await rebuild_user_filter(AsyncSessionFactory)
+            except Exception as e:
+                logger.warning(f"⚠️ 用户存在性过滤器构建失败，将直接查询数据库: {e}")
+            if settings.USER_FILTER_REFRESH_SECONDS > 0:
+                user_filter_task = asyncio.create_task(
+                    run_user_filter_refresher(
+                        AsyncSessionFactory, settings.USER_FILTER_REFRESH_SECONDS
+                    )
+                )
+
+        # 定期清理过期的刷新令牌
+        refresh_token_task = None
+        if settings.REFRESH_TOKEN_CLEANUP_SECONDS > 0:
+            refresh_token_task = asyncio.create_task(
+                run_refresh_token_cleaner(
+                    AsyncSessionFactory, settings.REFRESH_TOKEN_CLEANUP_SECONDS
+                )
+            )
+
+        # 预热SMTP连接池（失败不影响启动），启动发件箱调度器
+        await email_service.start()
+        outbox_dispatcher.start()
+
         # 开发环境显示更多信息
         if settings.is_development:
             logger.info(f"🔧 调试模式: {settings.DEBUG}")
@@ -52,6 +115,17 @@ async def lifespan(app: FastAPI):
     try:
         # 关闭逻辑
         logger.info("👋 应用正在关闭...")
+        if search_index_task is not None:
+            search_index_task.cancel()
+        if user_filter_task is not None:
+            user_filter_task.cancel()
+        if refresh_token_task is not None:
+            refresh_token_task.cancel()
+        await close_state_backend()
+        shutdown_hash_executor()
+        shutdown_image_executor()
+        await outbox_dispatcher.stop()
+        await email_service.close()
         await async_engine.dispose()
         logger.info("✅ 应用已关闭，资源已清理")
     except Exception as e:
@@ -64,8 +138,13 @@ app = FastAPI(
     version=settings.APP_VERSION,
     debug=settings.DEBUG,
     lifespan=lifespan,
+    # 未声明response_model的接口返回dict时使用orjson序列化
+    default_response_class=FastJSONResponse,
 )
 
+# 商品图片路由（支持缩放/转码变体）需先于静态目录注册，否则/images/{name}会被静态文件服务拦截
+app.include_router(image)
+
 # 挂载静态文件目录
 try:
     app.mount("/images", StaticFiles(directory=settings.STATIC_DIR), name="images")
@@ -81,11 +160,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（按Accept-Encoding选择zstd/brotli/gzip，小响应和图片等已压缩的内容类型不压缩）
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+
+# 按请求统计SQL次数和耗时，输出Server-Timing响应头（在压缩中间件外层，响应头随压缩后的响应一起发送）
+app.add_middleware(ServerTimingMiddleware)
+
+# 请求指标（最外层，耗时包含压缩等其他中间件）
+app.add_middleware(MetricsMiddleware)
+
 # 挂载路由
 app.include_router(register)
 app.include_router(login)
 app.include_router(product)
 app.include_router(passwordReset)
+app.include_router(user)
 
 
 # 全局捕获参数校验错误，统一返回格式
@@ -131,6 +220,15 @@ def health_check():
     }
 
 
+# 监控指标端点（Prometheus文本格式，不出现在接口文档中）
+# 必须为async：指标只在事件循环线程中更新且不加锁，同步函数会在线程池中渲染，与并发更新冲突
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 # 启动命令
 if __name__ == "__main__":
     import uvicorn
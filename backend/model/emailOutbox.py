@@ -0,0 +1,56 @@
+"""
+邮件发件箱模型（SQLModel）
+功能：定义待发送邮件的持久化队列表结构（事务性发件箱模式）
+适用场景：验证码邮件、密码重置成功通知等需要可靠投递、但不应阻塞接口响应的邮件
+技术说明：业务数据与发件箱记录在同一事务中提交，由后台调度器批量发送并回写状态，
+         邮件服务器慢或不可用时只影响投递延迟，不影响接口响应；进程重启后未发送的邮件继续投递
+依赖：SQLModel（ORM模型）、datetime（时间字段类型）、Field（字段约束定义）
+"""
+
+from sqlmodel import SQLModel, Field, DateTime, Text, Index
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+
+class EmailOutbox(SQLModel, table=True):
+    """
+    邮件发件箱数据表模型（对应数据库表：email_outbox）
+    每行代表一封待发送/已发送的邮件
+    表设计核心原则：
+        1. 可靠性：与业务数据同事务写入，提交成功即保证邮件最终会被尝试投递
+        2. 可重试：记录尝试次数和下次尝试时间，失败后按指数退避重试
+        3. 状态可追踪：pending-待发送，sending-发送中（已被调度器领取），sent-已发送，failed-重试耗尽
+        4. 高效领取：(status, next_attempt_at) 联合索引支撑调度器按到期时间批量领取
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    # 主键字段：自增ID
+    id: int | None = Field(default=None, primary_key=True)
+    # 收件人邮箱
+    to_email: str = Field(max_length=100)
+    # 邮件类型：verification_code-验证码，password_reset_success-密码重置成功通知
+    kind: str = Field(max_length=50)
+    # 邮件模板参数（JSON字符串），发送时渲染模板
+    payload: str = Field(default="{}", sa_type=Text)
+    # 投递状态：pending / sending / sent / failed
+    status: str = Field(default="pending", max_length=20)
+    # 已尝试发送次数
+    attempts: int = Field(default=0)
+    # 下次可尝试发送的时间（sending状态下表示领取租约的到期时间）
+    next_attempt_at: datetime = Field(
+        default_factory=lambda: datetime.now(ZoneInfo("Asia/Shanghai")),
+        sa_type=DateTime(timezone=True),
+    )
+    # 最近一次发送失败的原因
+    last_error: str | None = Field(default=None, max_length=500)
+    # 记录创建时间
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(ZoneInfo("Asia/Shanghai")),
+        sa_type=DateTime(timezone=True),
+    )
+    # 发送成功时间
+    sent_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
@@ -0,0 +1,46 @@
+"""
+刷新令牌模型（SQLModel）
+功能：定义刷新令牌的持久化表结构，用于在访问令牌过期后免密码换取新的访问令牌
+适用场景：登录态续期（客户端用刷新令牌换取新访问令牌，无需再次提交密码、无需bcrypt校验）
+技术说明：
+    1. 只存储令牌的SHA-256摘要，数据库泄露也无法还原出可用的刷新令牌
+    2. 每次使用后轮换：旧令牌作废并签发同一家族（family_id）的新令牌
+    3. 已作废的令牌被再次使用视为泄露，整个家族的令牌全部吊销
+依赖：SQLModel（ORM模型）、datetime（时间字段类型）、Field（字段约束定义）
+"""
+
+from sqlmodel import SQLModel, Field, DateTime
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+
+class RefreshToken(SQLModel, table=True):
+    """
+    刷新令牌数据表模型（对应数据库表：refresh_tokens）
+    每行代表一个签发过的刷新令牌
+    表设计核心原则：
+        1. 安全性：token_hash存储令牌摘要而非明文，唯一索引支撑按令牌精确查找
+        2. 可轮换：同一次登录派生的令牌共享family_id，支撑泄露时整体吊销
+        3. 状态管控：revoked_at非空表示已作废（已轮换/已吊销）
+        4. 定期清理：已过期的令牌（无论是否作废）按expires_at批量删除，避免表无限增长
+    """
+
+    __tablename__ = "refresh_tokens"
+
+    # 主键字段：自增ID
+    id: int | None = Field(default=None, primary_key=True)
+    # 所属用户ID：索引支撑按用户批量吊销（如重置密码后）
+    user_id: int = Field(index=True)
+    # 令牌SHA-256摘要（十六进制）
+    token_hash: str = Field(unique=True, index=True, max_length=64)
+    # 令牌家族ID：同一次登录后续轮换出的令牌共享同一个家族ID
+    family_id: str = Field(index=True, max_length=32)
+    # 过期时间：索引支撑定期按过期时间清理
+    expires_at: datetime = Field(sa_type=DateTime(timezone=True), index=True)
+    # 作废时间：为空表示令牌有效
+    revoked_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+    # 签发时间
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(ZoneInfo("Asia/Shanghai")),
+        sa_type=DateTime(timezone=True),
+    )
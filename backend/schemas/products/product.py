@@ -44,20 +44,49 @@ class ProductListResponse(BaseModel):
     """商品列表响应模型（带分页）
     定义分页查询商品列表时的标准化响应结构，兼顾数据返回与分页导航需求
     字段说明：
-        total: 总记录数（符合筛选条件的商品总数，用于计算分页总数）
+        total: 总记录数（符合筛选条件的商品总数，用于计算分页总数；count=none时为None）
         page: 当前页码（从1开始，与前端请求的页码参数一致）
         page_size: 每页数量（单次返回的商品条数，范围1-100）
-        total_pages: 总页数（由total/page_size向上取整计算得出，用于前端分页控件渲染）
+        total_pages: 总页数（由total/page_size向上取整计算得出，用于前端分页控件渲染；count=none时为None）
         products: 商品列表（当前页的商品数据，元素为ProductResponse模型）
+        next_cursor: 下一页游标（不透明字符串，传回cursor参数即可按主键定位下一页；无下一页时为None）
     补充：
         该模型仅返回有库存（in_stock=True）的商品数据，筛选逻辑由接口层实现
     """
 
-    total: int  # 总记录数
+    total: int | None  # 总记录数
     page: int  # 当前页码
     page_size: int  # 每页数量
-    total_pages: int  # 总页数
+    total_pages: int | None  # 总页数
     products: List[ProductResponse]  # 商品列表
+    next_cursor: str | None = None  # 下一页游标
+
+
+class SparseProductResponse(BaseModel):
+    """商品信息响应模型（指定返回字段）
+    请求商品列表时通过fields参数只返回部分字段（如宫格视图只需id,name,price,image_url），
+    未请求的字段不出现在响应中
+    字段说明：
+        id: 商品唯一标识（总是返回）
+        其余字段含义同ProductResponse，均为可选
+    """
+
+    id: int
+    name: str | None = None
+    description: str | None = None
+    price: float | None = None
+    image_url: str | None = None
+    category: str | None = None
+    in_stock: bool | None = None
+    created_at: datetime | None = None
+
+
+class SparseProductListResponse(ProductListResponse):
+    """商品列表响应模型（带分页，指定返回字段）
+    结构同ProductListResponse，products元素为SparseProductResponse
+    """
+
+    products: List[SparseProductResponse]  # 商品列表（仅包含请求的字段）
 
 
 class ProductCreateRequest(BaseModel):
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class AvailabilityResponse(BaseModel):
+    """用户名/邮箱可用性检查响应模型
+    字段说明：
+        username: 用户名是否可注册（未传入用户名时为None）
+        email: 邮箱是否可注册（未传入邮箱时为None）
+    """
+
+    username: bool | None = None
+    email: bool | None = None
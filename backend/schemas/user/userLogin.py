@@ -21,8 +21,30 @@ class LoginResponse(BaseModel):
         message: 操作提示信息（如"登录成功"）
         user: 用户公开信息（从UserResponse导入，隐藏哈希密码等敏感字段）
         token: 身份认证令牌（JWT/自定义令牌，前端后续请求需携带此令牌）
+        refresh_token: 刷新令牌（token过期后调用/token/refresh换取新token，无需重新登录）
     """
 
     message: str
     user: UserResponse
     token: str
+    refresh_token: str
+
+
+class RefreshTokenRequest(BaseModel):
+    """刷新令牌请求模型
+    字段说明：
+        refresh_token: 登录或上次刷新时返回的刷新令牌
+    """
+
+    refresh_token: str
+
+
+class RefreshTokenResponse(BaseModel):
+    """刷新令牌响应模型
+    字段说明：
+        token: 新的访问令牌
+        refresh_token: 新的刷新令牌（旧刷新令牌已作废，客户端必须替换保存）
+    """
+
+    token: str
+    refresh_token: str
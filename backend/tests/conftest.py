@@ -0,0 +1,9 @@
+"""
+测试公共配置
+说明：应用模块以backend目录为根导入（如from utils.stateBackend import ...），在任意目录执行pytest时都将其加入导入路径
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
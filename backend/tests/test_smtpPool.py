@@ -0,0 +1,150 @@
+"""
+SMTP连接池测试
+功能：以本地aiosmtpd服务器作为SMTP服务端替身，验证连接池的三项行为：
+    1. 连续发送的邮件复用同一个连接
+    2. 空闲连接NOOP健康检查失败时换用新连接
+    3. 服务端主动断开连接后，下一封邮件自动重连发送
+运行（在backend目录下执行）：python -m pytest -q tests
+"""
+
+import asyncio
+import socket
+from email.message import EmailMessage
+
+import pytest
+
+from utils.smtpPool import SMTPConnectionPool
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller  # noqa: E402
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class RecordingHandler:
+    """记录收到的邮件及其所在连接（以客户端地址区分），可模拟NOOP失败"""
+
+    def __init__(self):
+        self.deliveries: list[tuple] = []
+        self.noops = 0
+        self.fail_noop = False
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        self.noops += 1
+        return "421 Service not available" if self.fail_noop else "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.deliveries.append((session.peer, envelope.rcpt_tos))
+        return "250 Message accepted"
+
+
+class RecordingController(Controller):
+    """记录每个连接的服务端实例，测试中可从服务端主动断开连接"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.servers = []
+
+    def factory(self):
+        server = super().factory()
+        self.servers.append(server)
+        return server
+
+    def disconnect_all(self) -> None:
+        for server in self.servers:
+            if server.transport is not None:
+                self.loop.call_soon_threadsafe(server.transport.close)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = RecordingController(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    # start()会建立一次探测连接确认服务已就绪，不计入测试
+    controller.servers.clear()
+    yield controller, handler
+    controller.stop()
+
+
+def make_pool(controller, **kwargs) -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        host=controller.hostname,
+        port=controller.port,
+        username="",
+        password="",
+        start_tls=False,
+        **kwargs,
+    )
+
+
+def make_message(index: int) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = f"user{index}@example.com"
+    message["Subject"] = f"测试邮件{index}"
+    message.set_content("验证码：123456")
+    return message
+
+
+async def test_connection_reused(smtp_server):
+    controller, handler = smtp_server
+    pool = make_pool(controller, size=2)
+    try:
+        for index in range(3):
+            await pool.send_message(make_message(index))
+    finally:
+        await pool.close()
+
+    assert len(handler.deliveries) == 3
+    assert len({peer for peer, _ in handler.deliveries}) == 1
+    assert len(controller.servers) == 1
+
+
+async def test_noop_health_check_replaces_dead_connection(smtp_server):
+    controller, handler = smtp_server
+    # 空闲检查阈值为0：每次复用前都发送NOOP
+    pool = make_pool(controller, size=1, idle_check_seconds=0)
+    try:
+        await pool.send_message(make_message(0))
+        handler.fail_noop = True
+        await pool.send_message(make_message(1))
+    finally:
+        await pool.close()
+
+    assert handler.noops == 1
+    assert len(handler.deliveries) == 2
+    first_peer, second_peer = (peer for peer, _ in handler.deliveries)
+    assert first_peer != second_peer
+
+
+async def test_reconnect_after_server_disconnect(smtp_server):
+    controller, handler = smtp_server
+    # 空闲检查阈值很大：不做NOOP，断开的连接在借出时（已感知断开）或发送失败重试时被替换
+    pool = make_pool(controller, size=1, idle_check_seconds=3600)
+    try:
+        await pool.send_message(make_message(0))
+        controller.disconnect_all()
+        await asyncio.sleep(0.1)
+        await pool.send_message(make_message(1))
+        await pool.send_message(make_message(2))
+    finally:
+        await pool.close()
+
+    peers = [peer for peer, _ in handler.deliveries]
+    assert len(peers) == 3
+    assert peers[0] != peers[1]
+    # 重连后的新连接继续被复用
+    assert peers[1] == peers[2]
+    assert len(controller.servers) == 2
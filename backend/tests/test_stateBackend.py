@@ -0,0 +1,167 @@
+"""
+共享状态存储后端测试
+功能：同一组用例分别在MemoryStateBackend和RedisStateBackend（fakeredis模拟服务器，Lua脚本依赖lupa）上运行，
+     保证两种实现的行为一致：比较并删除（Lua脚本）、令牌桶（GCRA脚本）、位图（BITFIELD读写）、过期时间
+运行（在backend目录下执行）：python -m pytest -q tests
+"""
+
+import asyncio
+
+import pytest
+
+from utils.stateBackend import MemoryStateBackend, RedisStateBackend
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def backend(request, monkeypatch):
+    """按参数创建状态存储；Redis实现的客户端替换为fakeredis（每个用例独立的空数据库）"""
+    if request.param == "memory":
+        state_backend = MemoryStateBackend()
+    else:
+        from redis import asyncio as redis_asyncio
+
+        server = fakeredis.FakeServer()
+        monkeypatch.setattr(
+            redis_asyncio,
+            "Redis",
+            lambda **kwargs: fakeredis.FakeAsyncRedis(server=server),
+        )
+        state_backend = RedisStateBackend(
+            host="localhost", port=6379, password="", db=0, prefix="test:"
+        )
+    yield state_backend
+    await state_backend.close()
+
+
+async def test_get_set_delete(backend):
+    assert await backend.get("missing") is None
+    await backend.set("key", b"value")
+    assert await backend.get("key") == b"value"
+    await backend.delete("key")
+    assert await backend.get("key") is None
+    # 删除不存在的键不报错
+    await backend.delete("key")
+
+
+async def test_set_nx(backend):
+    assert await backend.set_nx("key", b"first") is True
+    assert await backend.set_nx("key", b"second") is False
+    assert await backend.get("key") == b"first"
+
+
+async def test_compare_and_delete(backend):
+    await backend.set("code", b"123456")
+    assert await backend.compare_and_delete("code", b"654321") is False
+    assert await backend.get("code") == b"123456"
+    assert await backend.compare_and_delete("code", b"123456") is True
+    assert await backend.get("code") is None
+    # 值只能被消费一次
+    assert await backend.compare_and_delete("code", b"123456") is False
+
+
+async def test_compare_and_delete_concurrent(backend):
+    """并发消费同一个值时只有一个请求成功"""
+    await backend.set("code", b"123456")
+    results = await asyncio.gather(
+        *(backend.compare_and_delete("code", b"123456") for _ in range(10))
+    )
+    assert results.count(True) == 1
+
+
+async def test_incr(backend):
+    assert await backend.incr("counter") == 1
+    assert await backend.incr("counter", 5) == 6
+    assert await backend.get("counter") == b"6"
+
+
+async def test_incr_ttl_set_on_create_only(backend):
+    await backend.incr("counter", ttl=10)
+    await backend.incr("counter", ttl=1000)
+    remaining = await backend.ttl("counter")
+    assert remaining is not None and 0 < remaining <= 10
+
+
+async def test_ttl(backend):
+    assert await backend.ttl("missing") is None
+    await backend.set("forever", b"1")
+    assert await backend.ttl("forever") is None
+    await backend.set("temporary", b"1", ttl=10)
+    remaining = await backend.ttl("temporary")
+    assert remaining is not None and 9 < remaining <= 10
+
+
+async def test_ttl_expiry(backend):
+    await backend.set("temporary", b"1", ttl=0.05)
+    await backend.incr("counter", ttl=0.05)
+    assert await backend.set_nx("lock", b"1", ttl=0.05) is True
+    await asyncio.sleep(0.1)
+    assert await backend.get("temporary") is None
+    assert await backend.ttl("temporary") is None
+    # 过期后计数器从0重新开始，锁可以重新获取
+    assert await backend.incr("counter", ttl=0.05) == 1
+    assert await backend.set_nx("lock", b"2", ttl=0.05) is True
+
+
+async def test_take_token_burst_then_wait(backend):
+    """桶容量内的突发请求全部通过，超出后返回约一个补充间隔的等待时间"""
+    capacity, period = 5, 1.0
+    for _ in range(capacity):
+        assert await backend.take_token("bucket", capacity, period) == 0
+    wait = await backend.take_token("bucket", capacity, period)
+    assert 0 < wait <= period / capacity
+    # 不同的键互不影响
+    assert await backend.take_token("other", capacity, period) == 0
+
+
+async def test_take_token_refill(backend):
+    capacity, period = 2, 0.2
+    for _ in range(capacity):
+        assert await backend.take_token("bucket", capacity, period) == 0
+    assert await backend.take_token("bucket", capacity, period) > 0
+    # 等待一个补充间隔后可再取一个令牌
+    await asyncio.sleep(period / capacity + 0.02)
+    assert await backend.take_token("bucket", capacity, period) == 0
+    assert await backend.take_token("bucket", capacity, period) > 0
+
+
+async def test_bits(backend):
+    assert await backend.get_bits("bitmap", [0, 7, 100]) == [False, False, False]
+    assert await backend.get_bits("bitmap", []) == []
+    await backend.set_bits("bitmap", [0, 9, 100])
+    assert await backend.get_bits("bitmap", [0, 1, 8, 9, 100, 101, 100000]) == [
+        True,
+        False,
+        False,
+        True,
+        True,
+        False,
+        False,
+    ]
+    # 重复设置与增量设置
+    await backend.set_bits("bitmap", [9, 15])
+    assert await backend.get_bits("bitmap", [9, 15]) == [True, True]
+    assert await backend.ttl("bitmap") is None
+
+
+async def test_bits_byte_layout(backend):
+    """位序与Redis SETBIT一致（字节内高位在前），两种实现写出的位图字节相同"""
+    await backend.set_bits("bitmap", [0, 9])
+    assert await backend.get("bitmap") == b"\x80\x40"
+
+
+async def test_set_bits_large_batch(backend):
+    """超过单条BITFIELD命令上限的批量设置分段发送"""
+    offsets = list(range(0, 30000, 7))
+    await backend.set_bits("bitmap", offsets)
+    assert all(await backend.get_bits("bitmap", offsets))
+    assert not any(await backend.get_bits("bitmap", [offset + 1 for offset in offsets]))
@@ -0,0 +1,100 @@
+"""
+进程内缓存工具类
+功能：提供带容量上限（LRU淘汰）和过期时间（TTL）的键值缓存，并统计命中/未命中次数
+适用场景：商品总数缓存、商品列表响应缓存等读多写少、允许短暂不一致的数据
+注意：缓存只在单个进程（单个uvicorn worker）内共享，且未加锁，仅应在事件循环线程中读写
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """带TTL的LRU缓存"""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        max_bytes: int | None = None,
+        sizeof: Callable[[Any], int] = len,
+    ):
+        """
+        :param maxsize: 最大缓存条目数，超出后淘汰最久未使用的条目
+        :param ttl: 默认过期时间（秒），set时可按条目单独指定
+        :param max_bytes: 缓存值总字节数上限（None表示只按条目数限制），超出后按LRU淘汰
+        :param sizeof: 计算单个缓存值字节数的函数（仅在设置max_bytes时使用）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        # 键 -> (过期时间戳, 值, 字节数)，OrderedDict的顺序即LRU顺序（末尾为最近使用）
+        self._data: OrderedDict[Hashable, tuple[float, Any, int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取未过期的缓存值，命中时将条目移到LRU队尾"""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            # 过期条目不立即删除，保留给get_stale使用，由LRU淘汰回收
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存值（忽略是否过期），不计入命中统计，用于允许近似值的场景"""
+        entry = self._data.get(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """写入缓存，ttl为None时使用默认过期时间"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # 单个值超过总容量，不缓存
+            self.delete(key)
+            return
+        self.delete(key)
+        self._data[key] = (expires_at, value, size)
+        self._bytes += size
+        while len(self._data) > self.maxsize or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """删除单个缓存条目（不存在时忽略）"""
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def clear(self) -> None:
+        """清空所有缓存条目（统计计数保留）"""
+        self._data.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict:
+        """缓存统计信息：条目数、占用字节数、命中数、未命中数、淘汰数、命中率"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
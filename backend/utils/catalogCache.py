@@ -0,0 +1,155 @@
+"""
+商品目录缓存
+功能：
+    1. 商品总数缓存：缓存商品列表查询中的总数统计（COUNT）结果，缓存键为(分类, 搜索关键词, 库存状态)
+    2. 商品列表响应缓存：缓存整页响应的JSON字节，缓存键为(页码, 每页数量, 分类, 搜索关键词, 游标, 计数方式)，
+       命中时接口直接返回字节，不访问数据库、不经过Pydantic序列化
+失效策略：条目按TTL自动过期；商品写入（新增/修改/上下架）后需调用invalidate_catalog主动失效
+多副本共享：STATE_BACKEND=redis时，列表响应在进程内缓存（一级）之外再写入Redis（二级），
+    二级缓存键包含目录版本号，invalidate_catalog通过递增版本号使所有副本的二级缓存同时失效；
+    其他副本的一级缓存在CATALOG_CACHE_TTL_SECONDS内自然过期
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+from config import settings
+from utils.cache import TTLCache
+from utils.compression import compress
+from utils.metrics import track_cache
+from utils.stateBackend import get_state_backend, is_shared_state_backend
+
+# 目录版本号在共享存储中的键
+CATALOG_VERSION_KEY = "catalog:version"
+
+# 商品总数缓存：筛选条件 -> 符合条件的商品总数
+product_count_cache = TTLCache(
+    maxsize=settings.PRODUCT_COUNT_CACHE_MAX_ENTRIES,
+    ttl=settings.PRODUCT_COUNT_CACHE_TTL_SECONDS,
+)
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    """缓存的商品列表响应：预序列化的JSON字节 + 由内容计算的强ETag + 各压缩编码的响应体"""
+
+    body: bytes
+    etag: str
+    # 压缩编码 -> 压缩后的响应体（按需生成，热门页面只压缩一次；体积远小于body，不计入缓存字节数）
+    encoded: dict[str, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+    def encoded_body(self, encoding: str) -> bytes:
+        """获取指定编码压缩后的响应体（首次请求该编码时以高压缩率压缩并保存在条目上）"""
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = compress(self.body, encoding, cached=True)
+        return body
+
+    def encoded_etag(self, encoding: str) -> str:
+        """压缩后表示的强ETag（不同编码的字节不同，ETag也必须不同）"""
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "CachedPage":
+        """由响应字节构造缓存条目（ETag取内容的BLAKE2b摘要，内容相同则ETag相同）"""
+        return cls(body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+# 商品列表响应缓存：分页查询参数 -> CachedPage（按条目数和总字节数双重限制）
+catalog_page_cache = TTLCache(
+    maxsize=settings.CATALOG_CACHE_MAX_ENTRIES,
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+    max_bytes=settings.CATALOG_CACHE_MAX_BYTES,
+    sizeof=lambda page: len(page.body),
+)
+track_cache("product_count", product_count_cache)
+track_cache("catalog_page", catalog_page_cache)
+
+
+def _normalize_search(search: str | None) -> str | None:
+    """搜索关键词去除首尾空格，空串视为无搜索条件"""
+    return search.strip() if search and search.strip() else None
+
+
+def product_count_key(
+    category: str | None, search: str | None, in_stock: bool = True
+) -> tuple:
+    """构造商品总数缓存键"""
+    return (category or None, _normalize_search(search), in_stock)
+
+
+def catalog_page_key(
+    page: int,
+    page_size: int,
+    category: str | None,
+    search: str | None,
+    after_id: int | None,
+    count: str,
+    fields: tuple[str, ...] | None = None,
+) -> tuple:
+    """
+    构造商品列表响应缓存键（游标模式下页码不影响结果，统一置为None）
+    fields为规范化后的返回字段（None表示全部字段），不同字段组合的响应分别缓存
+    """
+    return (
+        None if after_id is not None else page,
+        page_size,
+        category or None,
+        _normalize_search(search),
+        after_id,
+        count,
+        fields,
+    )
+
+
+def invalidate_product_counts() -> None:
+    """清空所有商品总数缓存"""
+    product_count_cache.clear()
+
+
+async def _shared_page_key(key: tuple) -> str:
+    """构造二级缓存键：目录版本号 + 分页查询参数"""
+    version = await get_state_backend().get(CATALOG_VERSION_KEY) or b"0"
+    params = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
+    return f"catalog:page:{version.decode()}:{params}"
+
+
+async def get_catalog_page(key: tuple) -> CachedPage | None:
+    """读取缓存的商品列表响应：先查进程内缓存，未命中且配置了共享存储时再查共享存储"""
+    page = catalog_page_cache.get(key)
+    if page is not None or not is_shared_state_backend():
+        return page
+    body = await get_state_backend().get(await _shared_page_key(key))
+    if body is None:
+        return None
+    page = CachedPage.from_body(body)
+    catalog_page_cache.set(key, page)
+    return page
+
+
+async def store_catalog_page(key: tuple, body: bytes) -> CachedPage:
+    """写入商品列表响应缓存（进程内 + 共享存储），返回带ETag的缓存条目"""
+    page = CachedPage.from_body(body)
+    catalog_page_cache.set(key, page)
+    if is_shared_state_backend():
+        await get_state_backend().set(
+            await _shared_page_key(key), body, ttl=settings.CATALOG_CACHE_TTL_SECONDS
+        )
+    return page
+
+
+async def invalidate_catalog() -> None:
+    """商品数据变更后调用：清空商品总数缓存和商品列表响应缓存（含所有副本的共享缓存）"""
+    invalidate_product_counts()
+    catalog_page_cache.clear()
+    if is_shared_state_backend():
+        await get_state_backend().incr(CATALOG_VERSION_KEY)
+
+
+def catalog_cache_stats() -> dict:
+    """商品目录缓存统计信息（命中/未命中/淘汰计数等）"""
+    return {
+        "product_counts": product_count_cache.stats,
+        "catalog_pages": catalog_page_cache.stats,
+    }
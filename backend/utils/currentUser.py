@@ -0,0 +1,114 @@
+"""
+当前登录用户依赖
+功能：从请求头Authorization: Bearer <token>中解析访问令牌，返回当前登录用户
+缓存：
+    1. 已验证令牌缓存：令牌 → 声明（claims），条目在令牌exp到期时失效，
+       同一令牌的后续请求无需重复做HMAC校验和JSON解析
+    2. 用户快照缓存：用户ID → 用户公开信息，短TTL（默认30秒），
+       命中时不访问数据库；用户信息变更（禁用、改密等）时调用invalidate_user立即失效
+使用：需要登录的接口声明参数 current_user: UserResponse = Depends(get_current_user)
+注意：缓存只在单个进程内有效，用户被禁用后其他worker最多在快照TTL内仍放行
+"""
+
+import logging
+import time
+
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from config import settings
+from database import AsyncSessionFactory
+from model.user import User
+from schemas.user.userResponse import UserResponse
+from utils.cache import TTLCache
+from utils.metrics import track_cache
+
+logger = logging.getLogger(__name__)
+
+# auto_error=False：缺少令牌时由get_current_user统一返回401（HTTPBearer默认返回403）
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# 已验证令牌缓存：条目过期时间在写入时按令牌exp单独设置
+verified_token_cache = TTLCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_HOURS * 3600,
+)
+# 用户快照缓存
+user_snapshot_cache = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS,
+)
+track_cache("verified_token", verified_token_cache)
+track_cache("user_snapshot", user_snapshot_cache)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def verify_access_token(token: str) -> dict:
+    """校验访问令牌并返回声明，校验结果按令牌缓存至其过期时间"""
+    claims = verified_token_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.ExpiredSignatureError:
+        raise _unauthorized("登录已过期，请重新登录")
+    except jwt.InvalidTokenError:
+        raise _unauthorized("无效的登录凭证")
+    # 重置密码令牌等其他类型的令牌不能作为访问令牌使用
+    if claims.get("type", "access") != "access":
+        raise _unauthorized("无效的登录凭证")
+    verified_token_cache.set(token, claims, ttl=claims["exp"] - time.time())
+    return claims
+
+
+async def load_user_snapshot(user_id: int) -> UserResponse | None:
+    """读取用户快照：优先走缓存，未命中时查询数据库并写入缓存"""
+    snapshot = user_snapshot_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+    async with AsyncSessionFactory() as session:
+        user = await session.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = UserResponse.model_validate(user.model_dump())
+    user_snapshot_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def invalidate_user(user_id: int) -> None:
+    """用户信息变更后调用，使本进程内的用户快照立即失效"""
+    user_snapshot_cache.delete(user_id)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> UserResponse:
+    """FastAPI依赖项：返回当前登录用户（未登录/令牌无效返回401，账户禁用返回403）"""
+    if credentials is None:
+        raise _unauthorized("未登录或登录已过期")
+    claims = verify_access_token(credentials.credentials)
+    try:
+        user_id = int(claims["sub"])
+    except (TypeError, ValueError):
+        raise _unauthorized("无效的登录凭证")
+
+    user = await load_user_snapshot(user_id)
+    if user is None:
+        raise _unauthorized("用户不存在")
+    if not user.is_active:
+        logger.warning(f"访问被拒绝：账户已禁用，用户ID={user_id}")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="账户已被禁用")
+    return user
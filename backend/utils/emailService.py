@@ -1,14 +1,14 @@
 """
 邮件发送服务工具类
 功能：封装SMTP邮件发送逻辑，支持发送验证码邮件
-依赖：smtplib（Python内置SMTP客户端）、email（邮件内容构建）
+依赖：aiosmtplib（异步SMTP客户端，经SMTPConnectionPool复用长连接）、email（邮件内容构建）
 适用场景：密码重置验证码、注册验证码、系统通知等邮件发送场景
 """
 
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config import settings  # 导入项目配置（SMTP服务器信息等）
+from utils.smtpPool import SMTPConnectionPool
 import logging
 
 # 初始化日志器（logger名称为当前模块名，便于日志溯源）
@@ -25,8 +25,33 @@ class EmailService:
         self.smtp_user = settings.SMTP_USER
         self.smtp_password = settings.SMTP_PASSWORD
         self.email_from = settings.EMAIL_FROM or settings.SMTP_USER
+        # SMTP长连接池：复用已完成STARTTLS和登录的连接
+        self.pool = SMTPConnectionPool(
+            host=self.smtp_host,
+            port=self.smtp_port,
+            username=self.smtp_user,
+            password=self.smtp_password,
+            size=settings.SMTP_POOL_SIZE,
+            timeout=settings.SMTP_TIMEOUT,
+            idle_check_seconds=settings.SMTP_IDLE_CHECK_SECONDS,
+            start_tls=settings.SMTP_START_TLS,
+        )
+
+    async def start(self) -> None:
+        """应用启动时预热SMTP连接（未配置SMTP或连接失败时仅记录日志）"""
+        if not self.smtp_host:
+            return
+        try:
+            await self.pool.warm_up()
+            logger.info(f"SMTP连接池预热完成：{self.smtp_host}:{self.smtp_port}")
+        except Exception as e:
+            logger.warning(f"SMTP连接池预热失败，将在首次发送时重试：{str(e)}")
+
+    async def close(self) -> None:
+        """应用关闭时释放SMTP连接"""
+        await self.pool.close()
 
-    def send_verification_code(self, to_email: str, code: str) -> bool:
+    async def send_verification_code(self, to_email: str, code: str) -> bool:
         """
         发送验证码邮件
         :param to_email: 收件人邮箱
@@ -96,11 +121,8 @@ class EmailService:
             html_part = MIMEText(html_content, "html", "utf-8")
             message.attach(html_part)
 
-            # 连接SMTP服务器并发送邮件
-            with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=30) as server:
-                server.starttls()  # 启用TLS加密
-                server.login(self.smtp_user, self.smtp_password)  # 登录SMTP服务器
-                server.send_message(message)  # 发送邮件
+            # 从连接池借用已登录的连接发送邮件
+            await self.pool.send_message(message)
 
             logger.info(f"验证码邮件发送成功：{to_email}")
             return True
@@ -111,7 +133,7 @@ class EmailService:
             )
             return False
 
-    def send_password_reset_success(self, to_email: str, username: str) -> bool:
+    async def send_password_reset_success(self, to_email: str, username: str) -> bool:
         """
         发送密码重置成功通知邮件
         :param to_email: 收件人邮箱
@@ -168,10 +190,7 @@ class EmailService:
             html_part = MIMEText(html_content, "html", "utf-8")
             message.attach(html_part)
 
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(message)
+            await self.pool.send_message(message)
 
             logger.info(f"密码重置成功通知邮件发送成功：{to_email}")
             return True
@@ -1,8 +1,21 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
+from config import settings
+from utils.metrics import CallbackMetric
+
 # 配置密码上下文，指定使用bcrypt算法
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt计算池：单次哈希/校验耗时约100-300ms，放到线程池/进程池执行，避免阻塞事件循环
+# 线程池依赖bcrypt在计算期间释放GIL；进程池可绕开GIL但有进程间通信开销
+_hash_executor: Executor | None = None
+# 已提交到计算池、尚未完成的任务数（含排队中的任务），只在事件循环线程中读写
+_pending_tasks = 0
+
 
 def hash_password(password: str) -> str:
     """
@@ -21,3 +34,77 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     :return: 匹配返回True，否则返回False
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def _get_hash_executor() -> Executor:
+    """获取bcrypt计算池（首次调用时按配置创建）"""
+    global _hash_executor
+    if _hash_executor is None:
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="bcrypt",
+            )
+    return _hash_executor
+
+
+async def _run_in_hash_pool(func, *args):
+    """
+    在bcrypt计算池中执行函数
+    排队任务数达到上限时直接返回503，避免请求在队列中堆积直至超时
+    """
+    global _pending_tasks
+    if _pending_tasks >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="服务器繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+    _pending_tasks += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        _pending_tasks -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """异步版hash_password：在计算池中执行bcrypt哈希，不阻塞事件循环"""
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """异步版verify_password：在计算池中执行bcrypt校验，不阻塞事件循环"""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+def hash_pool_stats() -> dict:
+    """bcrypt计算池统计信息：工作线程/进程数、未完成任务数、排队上限"""
+    return {
+        "executor": settings.PASSWORD_HASH_EXECUTOR,
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "pending": _pending_tasks,
+        "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+    }
+
+
+for _key, _documentation in (
+    ("pending", "bcrypt计算池未完成任务数（含排队）"),
+    ("max_pending", "bcrypt计算池最大未完成任务数（达到后返回503）"),
+    ("workers", "bcrypt计算池工作线程/进程数"),
+):
+    CallbackMetric(
+        f"password_hash_pool_{_key}",
+        _documentation,
+        lambda key=_key: [((), hash_pool_stats()[key])],
+    )
+
+
+def shutdown_hash_executor() -> None:
+    """应用关闭时释放bcrypt计算池"""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
@@ -0,0 +1,15 @@
+"""
+HTTP条件请求
+功能：etag_matches判断请求头If-None-Match是否命中当前ETag，命中时接口直接返回304，
+     商品列表、商品图片等带ETag的路由共用
+"""
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """判断请求头If-None-Match是否命中当前ETag（按RFC 9110使用弱比较，支持多个值和*）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
@@ -0,0 +1,282 @@
+"""
+商品图片变体
+功能：按请求的宽度和格式（WebP/AVIF/JPEG/PNG）生成缩放、重新压缩后的商品图片并缓存到磁盘，
+     后续请求直接返回缓存文件，商品宫格不再下载原尺寸大图
+使用：
+    GET /images/apple.jpg?w=320&fmt=webp（fmt=auto时按请求头Accept选择WebP/AVIF）
+    部署时预生成常用尺寸，避免首个访问者等待编码：
+    python -m utils.imageVariants [--widths 320 640] [--formats webp avif]
+缓存：变体文件保存在IMAGE_CACHE_DIR，文件名包含原图修改时间（原图更新后自动生成新变体）；
+     总大小超过IMAGE_CACHE_MAX_BYTES时按最近最少使用淘汰
+编码：在独立线程池中执行（Pillow缩放/编码期间释放GIL），同一变体的并发请求只编码一次
+依赖：Pillow（可选，pip install pillow；未安装时只能返回原图）
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from config import settings
+
+try:
+    from PIL import ExifTags, Image, ImageOps, features
+except ImportError:  # Pillow为可选依赖
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# 格式 → (Pillow格式名, MIME类型, 编码参数)
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"method": 4}),
+    "avif": ("AVIF", "image/avif", {}),
+    "jpeg": ("JPEG", "image/jpeg", {"optimize": True, "progressive": True}),
+    "png": ("PNG", "image/png", {"optimize": True}),
+}
+# 原图扩展名 → 未指定fmt时的输出格式
+SOURCE_FORMATS = {
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".png": "png",
+    ".webp": "webp",
+    ".gif": "png",
+}
+
+
+def _pillow_supports(fmt: str) -> bool:
+    """当前Pillow是否支持编码该格式（AVIF需要Pillow 11.2+且编译了libavif）"""
+    if Image is None:
+        return False
+    if fmt in ("jpeg", "png"):
+        return True
+    try:
+        return features.check_module(fmt)
+    except ValueError:  # 旧版本Pillow不认识该模块名
+        return False
+
+
+# 可用的输出格式（Pillow未安装时为空）
+SUPPORTED_FORMATS = [fmt for fmt in IMAGE_FORMATS if _pillow_supports(fmt)]
+
+
+def negotiate_format(accept: str | None, source: Path) -> str:
+    """
+    fmt=auto：按请求头Accept选择WebP/AVIF，都不支持时保持原图格式
+    同等质量参数下，宫格尺寸（≤640px）的WebP实测比AVIF更小，因此优先WebP
+    """
+    accept = accept or ""
+    for fmt in ("webp", "avif"):
+        if fmt in SUPPORTED_FORMATS and IMAGE_FORMATS[fmt][1] in accept:
+            return fmt
+    return source_format(source)
+
+
+def source_format(source: Path) -> str:
+    """原图对应的输出格式（未知格式统一输出PNG）"""
+    return SOURCE_FORMATS.get(source.suffix.lower(), "png")
+
+
+def render_variant(
+    source: Path, target: Path, width: int | None, fmt: str, quality: int
+) -> int:
+    """
+    生成图片变体并写入target（先写临时文件再原子替换，并发读取不会读到半个文件）
+    :return: 变体文件字节数
+    """
+    pil_format, _, options = IMAGE_FORMATS[fmt]
+    temp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with Image.open(source) as image:
+            # 先按EXIF方向摆正再缩放：宽度上限针对显示方向（旋转90°的照片原始高度才是显示宽度）
+            orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+            display_width = image.height if orientation in (5, 6, 7, 8) else image.width
+            resize = bool(width) and width < display_width
+            if resize:
+                # JPEG先按1/2、1/4、1/8缩小解码（draft），比完整解码后再缩放快得多；
+                # exif_transpose会完整解码图片，draft必须在它之前设置，保留2倍尺寸供LANCZOS缩放
+                scale = width / display_width * 2
+                image.draft(None, (int(image.width * scale), int(image.height * scale)))
+            image = ImageOps.exif_transpose(image)
+            if resize:
+                # 从不放大
+                image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+            if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(temp, pil_format, quality=quality, **options)
+        os.replace(temp, target)
+        return target.stat().st_size
+    finally:
+        temp.unlink(missing_ok=True)
+
+
+class ImageVariantCache:
+    """图片变体磁盘缓存（按总字节数做LRU淘汰）"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        # 文件名 → 字节数，按最近使用时间排序（末尾为最近使用）
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        # 正在生成的变体：文件名 → 编码任务（同一变体的并发请求共用一个任务）
+        self._pending: dict[str, asyncio.Task] = {}
+
+    def _load(self) -> None:
+        """首次使用时扫描缓存目录（按文件访问时间恢复LRU顺序，命中时会更新访问时间）"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = [path for path in self.directory.iterdir() if path.is_file()]
+        for path in sorted(files, key=lambda path: path.stat().st_atime):
+            if path.name.startswith("."):  # 上次异常退出残留的临时文件
+                path.unlink(missing_ok=True)
+                continue
+            self._add(path.name, path.stat().st_size)
+        self._loaded = True
+
+    def _add(self, name: str, size: int) -> None:
+        self._total_bytes += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            evicted, evicted_size = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_size
+            (self.directory / evicted).unlink(missing_ok=True)
+            logger.debug(f"图片变体缓存淘汰：{evicted}")
+
+    @staticmethod
+    def variant_name(source: Path, width: int | None, fmt: str) -> str:
+        """变体文件名：原图名.w宽度.原图修改时间.格式"""
+        return f"{source.name}.w{width or 0}.{source.stat().st_mtime_ns:x}.{fmt}"
+
+    def lookup(self, name: str) -> Path | None:
+        """查找已生成的变体（包括其他worker或预生成命令写入的文件）"""
+        path = self.directory / name
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            # 可能已被其他worker淘汰
+            if name in self._entries:
+                self._total_bytes -= self._entries.pop(name)
+            return None
+        if name in self._entries:
+            self._entries.move_to_end(name)
+        else:
+            self._add(name, stat.st_size)
+        # 只更新访问时间（不受noatime挂载选项影响）；修改时间参与ETag计算，保持不变
+        os.utime(path, (time.time(), stat.st_mtime))
+        return path
+
+    async def get(self, source: Path, width: int | None, fmt: str) -> Path:
+        """获取图片变体文件路径，未生成时在线程池中生成"""
+        if not self._loaded:
+            self._load()
+        name = self.variant_name(source, width, fmt)
+        path = self.lookup(name)
+        if path is not None:
+            return path
+        task = self._pending.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._render(source, name, width, fmt))
+            self._pending[name] = task
+            task.add_done_callback(lambda _: self._pending.pop(name, None))
+        # shield：某个请求被取消时不影响其他等待同一变体的请求
+        return await asyncio.shield(task)
+
+    async def _render(self, source: Path, name: str, width: int | None, fmt: str) -> Path:
+        path = self.directory / name
+        loop = asyncio.get_running_loop()
+        size = await loop.run_in_executor(
+            _get_image_executor(),
+            render_variant,
+            source,
+            path,
+            width,
+            fmt,
+            settings.IMAGE_VARIANT_QUALITY,
+        )
+        self._add(name, size)
+        logger.info(f"图片变体生成完成：{name}，大小={size}字节")
+        return path
+
+
+# 全局图片变体缓存实例
+image_variant_cache = ImageVariantCache(
+    settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_BYTES
+)
+
+# 图片编码线程池（首次生成变体时创建）
+_image_executor: ThreadPoolExecutor | None = None
+
+
+def _get_image_executor() -> ThreadPoolExecutor:
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS, thread_name_prefix="image"
+        )
+    return _image_executor
+
+
+def shutdown_image_executor() -> None:
+    """应用关闭时释放图片编码线程池"""
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=False, cancel_futures=True)
+        _image_executor = None
+
+
+def pregenerate(widths: list[int], formats: list[str]) -> int:
+    """预生成STATIC_DIR下所有图片的指定尺寸和格式，返回新生成的变体数"""
+    cache = ImageVariantCache(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_BYTES)
+    cache._load()
+    sources = [
+        path
+        for path in sorted(Path(settings.STATIC_DIR).iterdir())
+        if path.suffix.lower() in SOURCE_FORMATS
+    ]
+    with ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS) as executor:
+        futures = {}
+        for source in sources:
+            for width in widths:
+                for fmt in formats:
+                    name = cache.variant_name(source, width, fmt)
+                    if cache.lookup(name) is None:
+                        futures[name] = executor.submit(
+                            render_variant,
+                            source,
+                            cache.directory / name,
+                            width,
+                            fmt,
+                            settings.IMAGE_VARIANT_QUALITY,
+                        )
+        for name, future in futures.items():
+            cache._add(name, future.result())
+    return len(futures)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="预生成商品图片变体")
+    parser.add_argument(
+        "--widths",
+        type=int,
+        nargs="+",
+        default=settings.IMAGE_VARIANT_WIDTHS,
+        help="生成的宽度（默认IMAGE_VARIANT_WIDTHS）",
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=SUPPORTED_FORMATS,
+        default=[fmt for fmt in ("webp", "avif") if fmt in SUPPORTED_FORMATS],
+        help="生成的格式（默认当前Pillow支持的WebP/AVIF）",
+    )
+    args = parser.parse_args()
+    if Image is None:
+        parser.error("未安装Pillow，无法生成图片变体（pip install pillow）")
+    logging.basicConfig(level=logging.INFO)
+    count = pregenerate(args.widths, args.formats)
+    print(f"图片变体预生成完成：新生成{count}个，缓存目录={settings.IMAGE_CACHE_DIR}")
@@ -0,0 +1,245 @@
+"""
+应用指标（Prometheus文本格式）
+功能：
+    1. Counter / Gauge / Histogram：轻量指标类型，按标签值分别统计
+    2. CallbackMetric：在/metrics被抓取时才读取的指标（数据库连接池、bcrypt计算池、进程内缓存等），平时无开销
+    3. MetricsMiddleware：按路由记录请求数（含状态码）、耗时直方图和处理中的请求数
+    4. render_metrics：生成Prometheus文本格式（text/plain; version=0.0.4）
+并发：指标只在事件循环线程中更新，不加锁（与utils.cache相同的约定），记录一次请求只是几次字典操作；
+     每个uvicorn worker各自统计，Prometheus按实例分别抓取后再聚合
+"""
+
+import bisect
+import math
+import time
+from typing import Callable, Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from utils.cache import TTLCache
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# 默认耗时直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 已注册的指标（按注册顺序输出）
+_registry: list["Metric"] = []
+
+# 一条样本：(指标名后缀, 标签名-值对, 值)
+Sample = tuple[str, tuple[tuple[str, str], ...], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类"""
+
+    type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def _labels(self, values: tuple) -> tuple[tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, map(str, values)))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """只增计数器"""
+
+    type = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self._values.items():
+            yield "", self._labels(labels), value
+
+
+class Gauge(Counter):
+    """可增可减的瞬时值"""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    直方图：每次观测只定位并累加一个分桶（二分查找），输出时再计算累计值
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数（最后一个为+Inf）, 总和, 总数]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, (counts, total, count) in self._values.items():
+            label_pairs = self._labels(labels)
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                yield "_bucket", (*label_pairs, ("le", _format_value(bound))), cumulative
+            yield "_sum", label_pairs, total
+            yield "_count", label_pairs, count
+
+
+class CallbackMetric(Metric):
+    """抓取时通过回调读取的指标，回调返回[(标签值元组, 值), ...]"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Iterable[tuple[tuple, float]]],
+        labelnames: tuple[str, ...] = (),
+        type: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type = type
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self.callback():
+            yield "", self._labels(labels), value
+
+
+def render_metrics() -> str:
+    """生成所有已注册指标的Prometheus文本格式"""
+    lines = []
+    for metric in _registry:
+        try:
+            samples = list(metric.samples())
+        except Exception:
+            # 单个采集回调失败（如连接池已释放）不影响其他指标
+            continue
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for suffix, labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+            name = metric.name + suffix
+            if label_text:
+                name += "{" + label_text + "}"
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ==================== HTTP请求指标 ====================
+http_requests_total = Counter(
+    "http_requests_total", "HTTP请求总数", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP请求处理耗时（秒）", ("method", "route")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "正在处理的HTTP请求数")
+
+# ==================== 进程内缓存指标 ====================
+# 缓存名称 -> 缓存实例（抓取时读取TTLCache.stats）
+_tracked_caches: dict[str, TTLCache] = {}
+
+
+def track_cache(name: str, cache: TTLCache) -> None:
+    """登记进程内缓存，抓取时输出其命中/未命中/淘汰次数、条目数和占用字节数"""
+    _tracked_caches[name] = cache
+
+
+def _cache_stat(key: str) -> Callable[[], list[tuple[tuple, float]]]:
+    def callback():
+        return [((name,), cache.stats[key]) for name, cache in _tracked_caches.items()]
+
+    return callback
+
+
+for _name, _key, _documentation, _type in (
+    ("cache_hits_total", "hits", "进程内缓存命中次数", "counter"),
+    ("cache_misses_total", "misses", "进程内缓存未命中次数", "counter"),
+    ("cache_evictions_total", "evictions", "进程内缓存淘汰次数", "counter"),
+    ("cache_entries", "size", "进程内缓存条目数", "gauge"),
+    ("cache_bytes", "bytes", "进程内缓存占用字节数（仅限制字节数的缓存）", "gauge"),
+):
+    CallbackMetric(_name, _documentation, _cache_stat(_key), ("cache",), _type)
+
+
+class MetricsMiddleware:
+    """
+    请求指标中间件（纯ASGI实现）
+    路由标签取匹配到的路由模板（如/images/{name}），避免按实际路径产生海量标签
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # 路由匹配后scope中才有route；未匹配的请求（404扫描等）统一归为一个标签
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope["method"]
+            http_requests_total.inc(method, route, str(status_code))
+            http_request_duration_seconds.observe(
+                time.perf_counter() - start, method, route
+            )
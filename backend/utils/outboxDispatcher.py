@@ -0,0 +1,184 @@
+"""
+邮件发件箱调度器
+功能：后台协程批量领取email_outbox中到期的邮件并发送，按结果回写每行状态
+流程：领取（SELECT ... FOR UPDATE SKIP LOCKED，置为sending并设置租约）→ 提交 → 并发发送 → 批量回写状态
+可靠性：
+    1. 发送失败按指数退避重试，超过最大次数标记为failed
+    2. 进程在发送途中崩溃时，sending状态的记录在租约到期后会被重新领取（至少投递一次）
+    3. 多个worker同时运行调度器时，SKIP LOCKED保证同一封邮件不会被重复领取
+使用：接口中调用enqueue_email写入发件箱（与业务数据同事务），提交后调用outbox_dispatcher.notify()立即唤醒调度器
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlmodel import select, update
+
+from config import settings
+from database import AsyncSessionFactory
+from model.emailOutbox import EmailOutbox
+from model.user import User
+from utils.emailService import email_service
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(session, to_email: str, kind: str, payload: dict) -> EmailOutbox:
+    """将邮件写入发件箱（仅加入会话，随调用方事务一起提交）"""
+    message = EmailOutbox(
+        to_email=to_email,
+        kind=kind,
+        payload=json.dumps(payload, ensure_ascii=False),
+    )
+    session.add(message)
+    return message
+
+
+async def _username_by_email(email: str) -> str | None:
+    """按邮箱查询用户名（在调度器中执行，不占用接口请求的数据库往返）"""
+    async with AsyncSessionFactory() as session:
+        return (
+            await session.exec(select(User.username).where(User.email == email))
+        ).first()
+
+
+async def deliver(message: EmailOutbox) -> bool:
+    """按邮件类型渲染模板并发送"""
+    payload = json.loads(message.payload)
+    if message.kind == "verification_code":
+        return await email_service.send_verification_code(message.to_email, payload["code"])
+    if message.kind == "password_reset_success":
+        # 重置密码接口不查询用户名，由调度器发送前查询；用户已不存在时以邮箱称呼
+        username = payload.get("username") or await _username_by_email(message.to_email)
+        return await email_service.send_password_reset_success(
+            message.to_email, username or message.to_email
+        )
+    logger.error(f"未知的邮件类型：{message.kind}，发件箱ID={message.id}")
+    return False
+
+
+class OutboxDispatcher:
+    """邮件发件箱后台调度器"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def notify(self) -> None:
+        """有新邮件入队时调用，立即唤醒调度器（无需等待下一个轮询周期）"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    def _retry_delay(attempts: int) -> timedelta:
+        """指数退避：基础间隔 × 2^(已尝试次数-1)，最长1小时"""
+        seconds = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+        return timedelta(seconds=min(seconds, 3600))
+
+    async def _claim_batch(self) -> list[EmailOutbox]:
+        """领取一批到期邮件：置为sending并设置租约，提交后释放行锁"""
+        now = datetime.now(ZoneInfo("Asia/Shanghai"))
+        async with self.session_factory() as session:
+            statement = (
+                select(EmailOutbox)
+                .where(
+                    EmailOutbox.status.in_(["pending", "sending"]),
+                    EmailOutbox.next_attempt_at <= now,
+                )
+                .order_by(EmailOutbox.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            messages = (await session.exec(statement)).all()
+            lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            for message in messages:
+                message.status = "sending"
+                message.attempts += 1
+                message.next_attempt_at = lease_until
+                session.add(message)
+            await session.commit()
+            return list(messages)
+
+    async def _record_results(self, messages: list[EmailOutbox], results: list) -> None:
+        """批量回写本批邮件的发送结果"""
+        now = datetime.now(ZoneInfo("Asia/Shanghai"))
+        async with self.session_factory() as session:
+            for message, result in zip(messages, results):
+                if result is True:
+                    values = {"status": "sent", "sent_at": now, "last_error": None}
+                else:
+                    error = str(result) if isinstance(result, Exception) else "邮件发送失败"
+                    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                        values = {"status": "failed", "last_error": error[:500]}
+                        logger.error(
+                            f"邮件投递失败且重试次数已用尽：发件箱ID={message.id}，收件人={message.to_email}"
+                        )
+                    else:
+                        values = {
+                            "status": "pending",
+                            "next_attempt_at": now + self._retry_delay(message.attempts),
+                            "last_error": error[:500],
+                        }
+                await session.exec(
+                    update(EmailOutbox).where(EmailOutbox.id == message.id).values(**values)
+                )
+            await session.commit()
+
+    async def dispatch_batch(self) -> int:
+        """领取并发送一批邮件，返回本批处理的邮件数"""
+        messages = await self._claim_batch()
+        if not messages:
+            return 0
+        # 并发发送（实际并发度受SMTP连接池大小限制）
+        results = await asyncio.gather(
+            *(deliver(message) for message in messages), return_exceptions=True
+        )
+        await self._record_results(messages, results)
+        logger.info(
+            f"发件箱调度：本批{len(messages)}封，成功{sum(r is True for r in results)}封"
+        )
+        return len(messages)
+
+    async def run(self) -> None:
+        """调度主循环：整批处理满时继续领取，否则等待唤醒或轮询间隔"""
+        while True:
+            self._wakeup.clear()
+            try:
+                processed = await self.dispatch_batch()
+            except Exception as e:
+                logger.error(f"发件箱调度异常：{str(e)}", exc_info=True)
+                processed = 0
+            if processed >= settings.OUTBOX_BATCH_SIZE:
+                continue
+            # 不使用wait_for：Python 3.11及以下版本中，唤醒事件恰好被set时到达的取消会被wait_for吞掉，
+            # stop()将永远等待；asyncio.wait不取消也不吞掉取消，等待结束后手动取消事件等待任务
+            wakeup = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait([wakeup], timeout=settings.OUTBOX_POLL_SECONDS)
+            finally:
+                wakeup.cancel()
+
+    def start(self) -> None:
+        """启动后台调度协程"""
+        if self._task is None:
+            # 事件对象绑定到当前事件循环，每次启动时重新创建
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """停止后台调度协程（未发送完的邮件留在发件箱，重启后继续投递）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 全局发件箱调度器实例
+outbox_dispatcher = OutboxDispatcher(AsyncSessionFactory)
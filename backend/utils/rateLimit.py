@@ -0,0 +1,167 @@
+"""
+接口限流
+功能：基于令牌桶（GCRA算法）的路由级限流，按IP、邮箱、账号等维度分别计数，
+     超出限制时返回429并通过Retry-After告知客户端需要等待的秒数
+存储：令牌桶状态保存在共享状态存储中（STATE_BACKEND=memory时为进程内字典，判断在微秒级完成；
+     redis时多个worker/副本共享同一份计数）
+使用：在路由上声明限流策略，例如
+    @router.post("/login", dependencies=[Depends(login_ip_limit), Depends(login_account_limit)])
+限流规则格式为"次数/秒数"，如"5/60"表示60秒内最多5次（允许突发5次，之后每12秒恢复1次）
+客户端IP：部署在反向代理之后时，直连地址都是代理地址，需在TRUSTED_PROXIES中配置代理的IP或网段，
+     来自可信代理的请求按X-Forwarded-For从右向左跳过可信代理，第一个不可信的地址即客户端IP
+"""
+
+import ipaddress
+import logging
+import math
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException, Request, status
+
+from config import settings
+from utils.stateBackend import get_state_backend
+
+logger = logging.getLogger(__name__)
+
+# 限流键提取函数：返回None表示该请求不参与此策略的限流
+KeyFunc = Callable[[Request], Awaitable[str | None]]
+
+
+def parse_rate(rate: str) -> tuple[int, float]:
+    """解析限流规则"次数/秒数"，返回(次数, 秒数)"""
+    try:
+        count, seconds = rate.split("/")
+        capacity, period = int(count), float(seconds)
+    except ValueError:
+        raise ValueError(f"无效的限流规则：{rate!r}，格式应为'次数/秒数'")
+    if capacity < 1 or period <= 0:
+        raise ValueError(f"无效的限流规则：{rate!r}，次数和秒数必须大于0")
+    return capacity, period
+
+
+@lru_cache(maxsize=1)
+def _trusted_networks(proxies: tuple[str, ...]) -> tuple:
+    """解析可信代理列表（IP或CIDR网段）"""
+    return tuple(ipaddress.ip_network(proxy.strip(), strict=False) for proxy in proxies)
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_networks(tuple(settings.TRUSTED_PROXIES)))
+
+
+def resolve_client_ip(peer: str | None, forwarded_for: str | None) -> str | None:
+    """
+    确定客户端真实IP
+    :param peer: 直连的对端地址
+    :param forwarded_for: X-Forwarded-For请求头（每经过一层代理在末尾追加上一跳地址）
+    :return: 对端不是可信代理时直接返回对端地址（请求头可被客户端伪造，不予采信）；
+             否则从右向左跳过可信代理，返回第一个不可信的地址，全部可信时返回最左侧地址
+    """
+    if peer is None or not forwarded_for or not _is_trusted(peer):
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+async def client_ip(request: Request) -> str | None:
+    """按客户端IP限流（反向代理之后按X-Forwarded-For识别，见resolve_client_ip）"""
+    peer = request.client.host if request.client else None
+    return resolve_client_ip(peer, request.headers.get("x-forwarded-for"))
+
+
+def body_field(field: str) -> KeyFunc:
+    """按请求体JSON中的某个字段限流（如邮箱、登录账号），字段缺失时不限流"""
+
+    async def key_func(request: Request) -> str | None:
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        value = body.get(field) if isinstance(body, dict) else None
+        if not isinstance(value, str) or not value.strip():
+            return None
+        return value.strip().lower()
+
+    return key_func
+
+
+class RateLimit:
+    """
+    路由级限流策略（FastAPI依赖项）
+    :param name: 策略名称（作为存储键的一部分，不同策略互不影响）
+    :param rate: 限流规则"次数/秒数"
+    :param key_func: 限流维度（client_ip / body_field("email") 等）
+    :param message: 超出限制时的提示信息，{seconds}替换为需要等待的秒数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: str,
+        key_func: KeyFunc = client_ip,
+        message: str = "请求过于频繁，请{seconds}秒后再试",
+    ):
+        self.name = name
+        self.capacity, self.period = parse_rate(rate)
+        self.key_func = key_func
+        self.message = message
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        key = await self.key_func(request)
+        if key is None:
+            return
+        try:
+            wait = await get_state_backend().take_token(
+                f"ratelimit:{self.name}:{key}", self.capacity, self.period
+            )
+        except Exception as e:
+            # 状态存储不可用时放行，避免限流组件故障导致接口整体不可用
+            logger.warning(f"限流检查失败，已放行：策略={self.name}，错误={str(e)}")
+            return
+        if wait > 0:
+            seconds = max(math.ceil(wait), 1)
+            logger.warning(f"触发限流：策略={self.name}，键={key}，需等待{seconds}秒")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=self.message.format(seconds=seconds),
+                headers={"Retry-After": str(seconds)},
+            )
+
+
+# ==================== 限流策略 ====================
+# 登录：按IP限制总尝试次数，按账号限制撞库/暴力破解
+login_ip_limit = RateLimit("login:ip", settings.LOGIN_RATE_LIMIT_PER_IP)
+login_account_limit = RateLimit(
+    "login:account",
+    settings.LOGIN_RATE_LIMIT_PER_ACCOUNT,
+    key_func=body_field("username"),
+    message="该账号登录尝试过于频繁，请{seconds}秒后再试",
+)
+# 注册：按IP限制批量注册
+register_ip_limit = RateLimit("register:ip", settings.REGISTER_RATE_LIMIT_PER_IP)
+# 发送验证码：按邮箱限制发送间隔，按IP限制轮换邮箱刷验证码
+send_code_email_limit = RateLimit(
+    "send_code:email",
+    settings.SEND_CODE_RATE_LIMIT_PER_EMAIL,
+    key_func=body_field("email"),
+    message="验证码发送过于频繁，请{seconds}秒后再试",
+)
+send_code_ip_limit = RateLimit(
+    "send_code:ip",
+    settings.SEND_CODE_RATE_LIMIT_PER_IP,
+    message="验证码发送过于频繁，请{seconds}秒后再试",
+)
+# 用户名/邮箱可用性检查：按IP限制账号枚举
+availability_ip_limit = RateLimit(
+    "availability:ip", settings.AVAILABILITY_RATE_LIMIT_PER_IP
+)
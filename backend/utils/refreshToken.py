@@ -0,0 +1,167 @@
+"""
+刷新令牌工具
+功能：签发、轮换、吊销刷新令牌
+流程：登录成功签发刷新令牌 → 访问令牌过期后客户端调用/token/refresh → 旧刷新令牌作废并签发新刷新令牌和新访问令牌
+性能：续期只涉及SHA-256摘要和按唯一索引的数据库读写，不做bcrypt密码校验
+安全：
+    1. 数据库只保存令牌摘要
+    2. 轮换使用条件UPDATE（WHERE revoked_at IS NULL），并发请求中只有一个能成功使用同一令牌
+    3. 已作废的令牌再次出现视为令牌泄露（被窃取后与合法客户端先后使用），吊销整个令牌家族
+清理：已作废的令牌需保留到过期（用于识别重复使用），过期后由后台任务按expires_at索引分批删除
+"""
+
+import asyncio
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlmodel import delete, select, update
+
+from config import settings
+from model.refreshToken import RefreshToken
+from model.user import User
+
+logger = logging.getLogger(__name__)
+
+# 每批删除的过期令牌数（控制单个删除事务的锁范围）
+_PURGE_BATCH_SIZE = 1000
+
+
+class RefreshTokenError(Exception):
+    """刷新令牌无效、已过期或已被吊销"""
+
+
+def hash_refresh_token(token: str) -> str:
+    """计算刷新令牌摘要（令牌本身为高熵随机串，无需加盐和慢哈希）"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(session, user_id: int, family_id: str | None = None) -> str:
+    """签发刷新令牌（仅加入会话，随调用方事务一起提交），返回令牌明文"""
+    token = secrets.token_urlsafe(32)
+    session.add(
+        RefreshToken(
+            user_id=user_id,
+            token_hash=hash_refresh_token(token),
+            family_id=family_id or secrets.token_hex(16),
+            expires_at=datetime.now(ZoneInfo("Asia/Shanghai"))
+            + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+async def revoke_token_family(session, family_id: str) -> None:
+    """吊销整个令牌家族中仍有效的令牌（不提交）"""
+    await session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(ZoneInfo("Asia/Shanghai")))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def revoke_user_refresh_tokens(session, user_id: int) -> None:
+    """吊销用户的全部刷新令牌（不提交），用于重置密码等需要下线所有会话的场景"""
+    await session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(ZoneInfo("Asia/Shanghai")))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def revoke_refresh_tokens_by_email(session, email: str) -> None:
+    """按邮箱吊销用户的全部刷新令牌（不提交），用户ID通过子查询获取，无需额外往返"""
+    user_ids = select(User.id).where(User.email == email).scalar_subquery()
+    await session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.user_id.in_(user_ids), RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(ZoneInfo("Asia/Shanghai")))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rotate_refresh_token(session, token: str) -> tuple[int, str]:
+    """
+    使用刷新令牌：作废旧令牌并签发同家族的新令牌，提交后返回(用户ID, 新令牌明文)
+    令牌无效、已过期或已作废时抛出RefreshTokenError
+    """
+    now = datetime.now(ZoneInfo("Asia/Shanghai"))
+    record = (
+        await session.exec(
+            select(RefreshToken).where(
+                RefreshToken.token_hash == hash_refresh_token(token)
+            )
+        )
+    ).first()
+    if record is None:
+        raise RefreshTokenError("无效的刷新令牌")
+
+    # 条件UPDATE：只有未作废且未过期的令牌才能被作废，影响行数为0说明令牌已被使用或已过期
+    result = await session.exec(
+        update(RefreshToken)
+        .where(
+            RefreshToken.id == record.id,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(revoked_at=now)
+        # 不在会话内按条件同步已加载对象（驱动取出的时间不带时区，无法与now比较）
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        expires_at = record.expires_at
+        # 统一时区（部分数据库驱动取出的时间不带时区信息）
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=ZoneInfo("Asia/Shanghai"))
+        if expires_at > now:
+            # 未过期却无法作废，说明已被使用过：令牌可能已泄露，吊销整个家族，强制重新登录
+            logger.warning(
+                f"检测到刷新令牌重复使用，吊销令牌家族：用户ID={record.user_id}，家族ID={record.family_id}"
+            )
+            await revoke_token_family(session, record.family_id)
+            await session.commit()
+        raise RefreshTokenError("刷新令牌已失效，请重新登录")
+
+    new_token = issue_refresh_token(session, record.user_id, record.family_id)
+    await session.commit()
+    return record.user_id, new_token
+
+
+async def purge_expired_refresh_tokens(session_factory) -> int:
+    """分批删除已过期的刷新令牌，返回删除的行数"""
+    now = datetime.now(ZoneInfo("Asia/Shanghai"))
+    deleted = 0
+    while True:
+        async with session_factory() as session:
+            # 先按expires_at索引取出一批主键再按主键删除（MySQL不支持IN子查询中使用LIMIT）
+            ids = (
+                await session.exec(
+                    select(RefreshToken.id)
+                    .where(RefreshToken.expires_at <= now)
+                    .limit(_PURGE_BATCH_SIZE)
+                )
+            ).all()
+            if not ids:
+                break
+            await session.exec(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+            await session.commit()
+        deleted += len(ids)
+        if len(ids) < _PURGE_BATCH_SIZE:
+            break
+    if deleted:
+        logger.info(f"已清理过期刷新令牌：{deleted}条")
+    return deleted
+
+
+async def run_refresh_token_cleaner(session_factory, interval: float) -> None:
+    """后台定期清理已过期的刷新令牌"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await purge_expired_refresh_tokens(session_factory)
+        except Exception as e:
+            logger.error(f"过期刷新令牌清理失败：{str(e)}", exc_info=True)
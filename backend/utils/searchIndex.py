@@ -0,0 +1,217 @@
+"""
+商品名称N-gram倒排索引（进程内搜索引擎）
+功能：把商品名称（可选：商品描述）切分为单字+二元组（unigram/bigram）建立倒排索引，
+     将搜索关键词快速转换为候选商品ID集合，避免 LIKE '%关键词%' 的前导通配符导致全表扫描
+设计说明：
+    1. 面向中文短文本：水果名称多为2-5个汉字，单字+二元组即可覆盖任意长度的子串查询，
+       不依赖分词器；英文/数字按字符同样处理（统一NFKC规范化并转小写）
+    2. 索引只给出"候选超集"：候选ID仍会在数据库中用原LIKE条件复核，因此删除/改名时无需清理旧倒排项，
+       残留项只会多出候选，不会造成漏查；定期全量重建回收残留项
+    3. 倒排表使用array('I')按ID有序存储，每个倒排项4字节，百万级商品仍可常驻内存
+    4. 商品写入接口需调用upsert同步索引；多进程部署时其他worker新增的商品（ID大于索引已收录的最大ID）
+       由调用方直接交给LIKE条件判断，不会漏查；其他worker的改名依赖定期重建同步
+"""
+
+import asyncio
+import bisect
+import logging
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from typing import AsyncIterable, Iterable
+
+from sqlmodel import select
+
+from config import settings
+from model.product import Product
+
+logger = logging.getLogger(__name__)
+
+# LIKE通配符：关键词中包含这些字符时语义与子串匹配不同，不走索引
+_LIKE_WILDCARDS = ("%", "_")
+
+
+@dataclass(frozen=True)
+class SearchCandidates:
+    """索引查询结果"""
+
+    # 命中关键词的商品ID（候选超集，仍需LIKE复核）
+    ids: set[int]
+    # 查询时索引已收录的最大商品ID，更大的ID索引尚未收录，需直接交给LIKE条件判断
+    max_indexed_id: int
+
+
+def normalize_text(text: str) -> str:
+    """文本规范化：全角转半角（NFKC）、转小写、去除首尾空白"""
+    return unicodedata.normalize("NFKC", text).casefold().strip()
+
+
+def text_grams(text: str) -> set[str]:
+    """生成文本的全部单字和二元组"""
+    grams = set(text)
+    grams.update(text[i : i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_grams(query: str) -> set[str]:
+    """生成查询所需的索引项：单字查询用单字，否则用全部二元组"""
+    if len(query) == 1:
+        return {query}
+    return {query[i : i + 2] for i in range(len(query) - 1)}
+
+
+class NgramIndex:
+    """商品N-gram倒排索引"""
+
+    def __init__(self, include_description: bool = False):
+        """
+        :param include_description: 是否同时索引商品描述
+        """
+        self.include_description = include_description
+        # 索引项 -> 有序商品ID数组
+        self._postings: dict[str, array] = {}
+        # 是否已完成首次构建（未构建时search返回None，调用方回退到LIKE查询）
+        self.ready = False
+        # 已收录的最大商品ID
+        self.max_indexed_id = 0
+        # 重建期间到达的增量写入，重建完成后回放
+        self._pending: list[tuple[int, str, str | None]] | None = None
+
+    def _document(self, name: str, description: str | None) -> str:
+        """拼接需要被索引的文本（名称与描述之间用换行分隔，避免跨字段产生二元组）"""
+        if self.include_description and description:
+            return f"{normalize_text(name)}\n{normalize_text(description)}"
+        return normalize_text(name)
+
+    @staticmethod
+    def _add(postings: dict[str, array], product_id: int, document: str) -> None:
+        """将单个商品加入倒排表（保持ID有序、不重复）"""
+        for gram in text_grams(document):
+            if gram == "\n":
+                continue
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = array("I", (product_id,))
+            elif ids[-1] < product_id:
+                ids.append(product_id)
+            else:
+                pos = bisect.bisect_left(ids, product_id)
+                if pos == len(ids) or ids[pos] != product_id:
+                    ids.insert(pos, product_id)
+
+    def upsert(self, product_id: int, name: str, description: str | None = None) -> None:
+        """新增或更新单个商品的索引（旧名称的残留倒排项由数据库复核过滤）"""
+        if self._pending is not None:
+            self._pending.append((product_id, name, description))
+        self._add(self._postings, product_id, self._document(name, description))
+        self.max_indexed_id = max(self.max_indexed_id, product_id)
+
+    async def rebuild(
+        self, rows: AsyncIterable[tuple[int, str, str | None]]
+    ) -> None:
+        """全量重建索引：构建新倒排表后整体替换，重建期间的增量写入在替换后回放"""
+        postings: dict[str, array] = {}
+        self._pending = []
+        max_indexed_id = 0
+        try:
+            count = 0
+            async for product_id, name, description in rows:
+                self._add(postings, product_id, self._document(name, description))
+                max_indexed_id = max(max_indexed_id, product_id)
+                count += 1
+            for product_id, name, description in self._pending:
+                self._add(postings, product_id, self._document(name, description))
+                max_indexed_id = max(max_indexed_id, product_id)
+            self._postings = postings
+            self.max_indexed_id = max_indexed_id
+            self.ready = True
+            logger.info(f"商品搜索索引构建完成：商品数={count}，索引项数={len(postings)}")
+        finally:
+            self._pending = None
+
+    def build(self, rows: Iterable[tuple[int, str, str | None]]) -> None:
+        """同步全量构建索引（用于脚本/基准测试等非事件循环场景）"""
+        postings: dict[str, array] = {}
+        max_indexed_id = 0
+        for product_id, name, description in rows:
+            self._add(postings, product_id, self._document(name, description))
+            max_indexed_id = max(max_indexed_id, product_id)
+        self._postings = postings
+        self.max_indexed_id = max_indexed_id
+        self.ready = True
+
+    def search(self, query: str) -> SearchCandidates | None:
+        """
+        将搜索关键词转换为候选商品ID集合
+        :return: 候选结果（ids为空表示已收录的商品中无匹配，ID大于max_indexed_id的商品仍可能匹配）；
+                 索引不可用或关键词不适合走索引时返回None
+        """
+        if not self.ready:
+            return None
+        query = normalize_text(query)
+        if not query or any(ch in query for ch in _LIKE_WILDCARDS):
+            return None
+
+        max_indexed_id = self.max_indexed_id
+        postings = []
+        for gram in query_grams(query):
+            ids = self._postings.get(gram)
+            if not ids:
+                return SearchCandidates(set(), max_indexed_id)
+            postings.append(ids)
+
+        # 从最短的倒排表出发，在其余倒排表中二分查找求交集
+        postings.sort(key=len)
+        candidates = postings[0]
+        result = set()
+        for product_id in candidates:
+            for ids in postings[1:]:
+                pos = bisect.bisect_left(ids, product_id)
+                if pos == len(ids) or ids[pos] != product_id:
+                    break
+            else:
+                result.add(product_id)
+        return SearchCandidates(result, max_indexed_id)
+
+    @property
+    def stats(self) -> dict:
+        """索引统计信息：索引项数、倒排项总数"""
+        return {
+            "ready": self.ready,
+            "max_indexed_id": self.max_indexed_id,
+            "grams": len(self._postings),
+            "postings": sum(len(ids) for ids in self._postings.values()),
+        }
+
+
+# 全局商品搜索索引实例
+product_search_index = NgramIndex(include_description=settings.SEARCH_INCLUDE_DESCRIPTION)
+
+
+async def _iter_products(session_factory) -> AsyncIterable[tuple[int, str, str | None]]:
+    """分批流式读取商品的ID、名称、描述"""
+    statement = select(Product.id, Product.name, Product.description).execution_options(
+        yield_per=5000
+    )
+    async with session_factory() as session:
+        result = await session.stream(statement)
+        async for partition in result.partitions():
+            for row in partition:
+                yield row
+            # 每批之间让出事件循环，避免大表构建时阻塞请求处理
+            await asyncio.sleep(0)
+
+
+async def rebuild_product_search_index(session_factory) -> None:
+    """从数据库全量重建商品搜索索引"""
+    await product_search_index.rebuild(_iter_products(session_factory))
+
+
+async def run_search_index_refresher(session_factory, interval: float) -> None:
+    """后台定期重建搜索索引（同步其他worker的商品写入、回收残留倒排项）"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await rebuild_product_search_index(session_factory)
+        except Exception as e:
+            logger.error(f"商品搜索索引定期重建失败：{str(e)}", exc_info=True)
@@ -0,0 +1,49 @@
+"""
+JSON快速序列化
+功能：
+    1. dumps：对象直接序列化为JSON字节，优先使用orjson（C实现，原生支持datetime），未安装时回退到标准库json
+    2. FastJSONResponse：基于dumps的响应类，作为应用默认响应类（未声明response_model的接口返回dict时使用）
+    3. rows_to_dicts：将SELECT指定列得到的行元组按列名组装为字典，跳过ORM对象构建和Pydantic校验
+说明：输出格式与Pydantic的model_dump_json保持一致（UTF-8原样输出、紧凑分隔符、datetime为ISO 8601），
+     同一份数据无论走哪条路径序列化，ETag都相同
+依赖：orjson（可选，pip install orjson）
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """标准库json回退路径：序列化datetime等非原生类型"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为JSON字节"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode()
+
+
+def rows_to_dicts(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> list[dict]:
+    """按列名将行元组组装为字典列表（列顺序需与SELECT的列顺序一致）"""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+class FastJSONResponse(JSONResponse):
+    """使用dumps序列化的JSON响应"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,65 @@
+"""
+请求耗时拆分（Server-Timing）
+功能：
+    1. 为每个请求创建SQL统计（database.QueryStats）并放入上下文变量，数据库引擎事件累计该请求的SQL次数和耗时
+    2. 响应头Server-Timing输出数据库耗时和请求总耗时（浏览器开发者工具Network → Timing可直接查看）：
+       Server-Timing: db;dur=3.2;desc="4 queries", app;dur=12.5
+    3. 每个请求记录一条统计日志（DEBUG级别）；SQL次数超过REQUEST_QUERY_WARN_COUNT时记录警告，用于发现N+1查询
+说明：总耗时截止到响应头发送时（与浏览器看到的等待时间一致），流式响应发送响应体期间执行的SQL不计入
+"""
+
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from database import QueryStats, current_query_stats
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """SQL统计与Server-Timing响应头中间件（纯ASGI实现）"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.SQL_TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        status_code = 500
+        elapsed = 0.0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, elapsed
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", '
+                    f"app;dur={elapsed * 1000:.1f}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            summary = (
+                f"method={scope['method']} path={scope['path']} status={status_code} "
+                f"queries={stats.count} db_ms={stats.duration * 1000:.1f} "
+                f"total_ms={elapsed * 1000:.1f}"
+            )
+            if 0 < settings.REQUEST_QUERY_WARN_COUNT < stats.count:
+                logger.warning(f"请求SQL次数过多（可能存在N+1查询）：{summary}")
+            else:
+                logger.debug(f"请求SQL统计：{summary}")
@@ -0,0 +1,151 @@
+"""
+异步SMTP连接池
+功能：维护少量已完成TLS握手和登录认证的长连接，邮件发送时直接复用，
+     避免每封邮件都重新建立TCP连接、STARTTLS握手和AUTH登录（多个网络往返）
+特性：
+    1. 基于aiosmtplib，全程异步，不阻塞事件循环
+    2. 连接空闲超过一定时间后，复用前先发送NOOP做健康检查，失效则自动重连
+    3. 发送过程中连接断开时丢弃该连接并用新连接重试一次
+依赖：aiosmtplib（异步SMTP客户端）
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+
+import aiosmtplib
+
+from utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# 邮件发送耗时（含借用连接、健康检查和断线重试）
+smtp_send_duration_seconds = Histogram(
+    "smtp_send_duration_seconds",
+    "SMTP邮件发送耗时（秒）",
+    ("result",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class SMTPConnectionPool:
+    """SMTP长连接池"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        size: int = 2,
+        timeout: float = 10,
+        idle_check_seconds: float = 30,
+        start_tls: bool = True,
+    ):
+        """
+        :param size: 最大连接数（同时发送的邮件数上限）
+        :param timeout: 连接/命令超时时间（秒）
+        :param idle_check_seconds: 连接空闲超过该时长后，复用前先做NOOP健康检查
+        :param start_tls: 是否在连接后执行STARTTLS
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.idle_check_seconds = idle_check_seconds
+        self.start_tls = start_tls
+        # 空闲连接栈：(连接, 最后使用时间)，后进先出，优先复用最近使用过的连接
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+        self._semaphore = asyncio.Semaphore(size)
+        # 连接池代数：每次close后递增，借出期间代数变化的连接归还时直接关闭
+        self._generation = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """建立新连接：TCP连接 → STARTTLS → AUTH登录"""
+        client = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            timeout=self.timeout,
+            start_tls=self.start_tls,
+            username=self.username or None,
+            password=self.password or None,
+        )
+        await client.connect()
+        logger.debug(f"SMTP连接已建立：{self.host}:{self.port}")
+        return client
+
+    @staticmethod
+    async def _discard(client: aiosmtplib.SMTP) -> None:
+        """关闭连接（忽略关闭过程中的异常）"""
+        try:
+            if client.is_connected:
+                await client.quit()
+        except Exception:
+            client.close()
+
+    async def _healthy(self, client: aiosmtplib.SMTP, last_used: float) -> bool:
+        """判断空闲连接是否仍可用：近期使用过的连接直接复用，空闲过久的发送NOOP确认"""
+        if not client.is_connected:
+            return False
+        if time.monotonic() - last_used < self.idle_check_seconds:
+            return True
+        try:
+            await client.noop()
+            return True
+        except aiosmtplib.SMTPException:
+            return False
+
+    @asynccontextmanager
+    async def connection(self):
+        """借出一个可用连接，使用完毕后归还；使用过程中出现异常时连接被丢弃"""
+        async with self._semaphore:
+            generation = self._generation
+            client = None
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if await self._healthy(candidate, last_used):
+                    client = candidate
+                    break
+                await self._discard(candidate)
+            if client is None:
+                client = await self._connect()
+            try:
+                yield client
+            except BaseException:
+                await self._discard(client)
+                raise
+            if generation != self._generation:
+                await self._discard(client)
+            else:
+                self._idle.append((client, time.monotonic()))
+
+    async def send_message(self, message: Message) -> None:
+        """发送邮件：连接在发送时断开则换新连接重试一次"""
+        start = time.perf_counter()
+        result = "error"
+        try:
+            try:
+                async with self.connection() as client:
+                    await client.send_message(message)
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+                logger.warning("SMTP连接已断开，使用新连接重试")
+                async with self.connection() as client:
+                    await client.send_message(message)
+            result = "success"
+        finally:
+            smtp_send_duration_seconds.observe(time.perf_counter() - start, result)
+
+    async def warm_up(self, count: int = 1) -> None:
+        """预先建立连接，使首封邮件无需等待TLS握手"""
+        for _ in range(min(count, self.size) - len(self._idle)):
+            self._idle.append((await self._connect(), time.monotonic()))
+
+    async def close(self) -> None:
+        """关闭所有空闲连接（借出中的连接在归还时关闭）"""
+        self._generation += 1
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._discard(client) for client, _ in idle))
@@ -0,0 +1,330 @@
+"""
+共享状态存储后端
+功能：为缓存、限流计数、验证码等短期状态提供统一的异步键值存储接口，支持两种实现：
+    1. MemoryStateBackend：进程内字典实现，零依赖，仅在单个worker内共享（开发环境/单进程部署/测试替身）
+    2. RedisStateBackend：基于Redis实现，多个worker、多个副本之间共享状态（使用config中的REDIS_*配置）
+通过配置项STATE_BACKEND选择实现，业务代码统一调用get_state_backend()获取实例
+约定：键统一为str，值统一为bytes；ttl单位为秒，None表示永不过期
+"""
+
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Sequence
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StateBackend(ABC):
+    """共享状态存储接口"""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """读取键值，不存在或已过期返回None"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """写入键值（覆盖已有值）"""
+
+    @abstractmethod
+    async def set_nx(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        """仅当键不存在时写入，写入成功返回True"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """删除键（不存在时忽略）"""
+
+    @abstractmethod
+    async def compare_and_delete(self, key: str, expected: bytes) -> bool:
+        """仅当键当前值等于expected时删除（原子操作），删除成功返回True"""
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        """原子自增并返回自增后的值；键不存在时从0开始，并设置过期时间ttl"""
+
+    @abstractmethod
+    async def take_token(self, key: str, capacity: int, period: float) -> float:
+        """
+        令牌桶取令牌（GCRA算法，原子操作）：桶容量为capacity，每period秒匀速补满
+        取到令牌返回0，否则返回需要等待的秒数
+        """
+
+    @abstractmethod
+    async def set_bits(self, key: str, offsets: Iterable[int]) -> None:
+        """将位图中指定偏移的位置为1（位图不存在时自动创建，永不过期）"""
+
+    @abstractmethod
+    async def get_bits(self, key: str, offsets: Sequence[int]) -> list[bool]:
+        """读取位图中指定偏移的位，位图不存在或超出长度的位视为0"""
+
+    @abstractmethod
+    async def ttl(self, key: str) -> float | None:
+        """返回键的剩余有效期（秒），键不存在或永不过期返回None"""
+
+    async def close(self) -> None:
+        """释放连接等资源"""
+
+
+class MemoryStateBackend(StateBackend):
+    """进程内状态存储（非线程安全，仅在事件循环线程中使用）"""
+
+    # 每写入多少次执行一次过期键清理
+    _SWEEP_INTERVAL = 1000
+
+    def __init__(self):
+        # 键 -> (值, 过期时间戳)；过期时间戳为None表示永不过期
+        self._data: dict[str, tuple[object, float | None]] = {}
+        self._writes = 0
+
+    def _alive(self, key: str):
+        """返回未过期的条目，过期条目顺带删除"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def _put(self, key: str, value, ttl: float | None) -> None:
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._data[key] = (value, expires_at)
+        self._writes += 1
+        if self._writes % self._SWEEP_INTERVAL == 0:
+            now = time.monotonic()
+            expired = [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]
+            for k in expired:
+                del self._data[k]
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._alive(key)
+        if entry is None:
+            return None
+        value = entry[0]
+        return str(value).encode() if isinstance(value, int) else value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        self._put(key, value, ttl)
+
+    async def set_nx(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        if self._alive(key) is not None:
+            return False
+        self._put(key, value, ttl)
+        return True
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def compare_and_delete(self, key: str, expected: bytes) -> bool:
+        # 单线程事件循环内读取与删除之间没有await，天然原子
+        if await self.get(key) != expected:
+            return False
+        del self._data[key]
+        return True
+
+    async def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        entry = self._alive(key)
+        if entry is None:
+            value = amount
+            self._put(key, value, ttl)
+        else:
+            value = int(entry[0]) + amount
+            self._data[key] = (value, entry[1])
+        return value
+
+    async def take_token(self, key: str, capacity: int, period: float) -> float:
+        # 只存储"理论到达时间"（TAT）：每取一个令牌TAT后移一个补充间隔，
+        # TAT超出当前时间的部分不能大于桶容量对应的容忍时长
+        now = time.monotonic()
+        interval = period / capacity
+        entry = self._alive(key)
+        tat = max(entry[0], now) if entry is not None else now
+        wait = tat + interval - now - period
+        if wait > 0:
+            return wait
+        self._put(key, tat + interval, tat + interval - now)
+        return 0.0
+
+    async def set_bits(self, key: str, offsets: Iterable[int]) -> None:
+        entry = self._alive(key)
+        bitmap = entry[0] if entry is not None else bytearray()
+        for offset in offsets:
+            index = offset >> 3
+            if index >= len(bitmap):
+                bitmap.extend(bytes(index + 1 - len(bitmap)))
+            # 与Redis SETBIT一致：字节内高位在前
+            bitmap[index] |= 0x80 >> (offset & 7)
+        if entry is None:
+            self._put(key, bitmap, None)
+
+    async def get_bits(self, key: str, offsets: Sequence[int]) -> list[bool]:
+        entry = self._alive(key)
+        bitmap = entry[0] if entry is not None else b""
+        return [
+            (offset >> 3) < len(bitmap)
+            and bool(bitmap[offset >> 3] & (0x80 >> (offset & 7)))
+            for offset in offsets
+        ]
+
+    async def ttl(self, key: str) -> float | None:
+        entry = self._alive(key)
+        if entry is None or entry[1] is None:
+            return None
+        return max(entry[1] - time.monotonic(), 0.0)
+
+
+class RedisStateBackend(StateBackend):
+    """基于Redis的共享状态存储（依赖redis-py的asyncio客户端）"""
+
+    # 比较并删除：GET与DEL在同一个Lua脚本内执行，避免两个请求同时消费同一个值
+    _COMPARE_AND_DELETE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    # 令牌桶（GCRA）：使用Redis服务器时间，多个副本之间不受本机时钟偏差影响；时间单位为毫秒
+    _TAKE_TOKEN_SCRIPT = """
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+    local interval = tonumber(ARGV[1])
+    local period = tonumber(ARGV[2])
+    local tat = tonumber(redis.call('GET', KEYS[1])) or now
+    if tat < now then
+        tat = now
+    end
+    local wait = tat + interval - now - period
+    if wait > 0 then
+        return wait
+    end
+    redis.call('SET', KEYS[1], tat + interval, 'PX', tat + interval - now)
+    return 0
+    """
+
+    def __init__(self, host: str, port: int, password: str, db: int, prefix: str):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "STATE_BACKEND=redis 需要安装redis依赖：pip install redis"
+            ) from e
+
+        self._client = redis_asyncio.Redis(
+            host=host, port=port, password=password or None, db=db
+        )
+        self._prefix = prefix
+        self._compare_and_delete = self._client.register_script(
+            self._COMPARE_AND_DELETE_SCRIPT
+        )
+        self._take_token = self._client.register_script(self._TAKE_TOKEN_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    @staticmethod
+    def _px(ttl: float | None) -> int | None:
+        """秒转毫秒（Redis最小过期时间为1毫秒）"""
+        return None if ttl is None else max(int(ttl * 1000), 1)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._client.get(self._key(key))
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        await self._client.set(self._key(key), value, px=self._px(ttl))
+
+    async def set_nx(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        return bool(await self._client.set(self._key(key), value, px=self._px(ttl), nx=True))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self._key(key))
+
+    async def compare_and_delete(self, key: str, expected: bytes) -> bool:
+        return bool(
+            await self._compare_and_delete(keys=[self._key(key)], args=[expected])
+        )
+
+    async def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        full_key = self._key(key)
+        if ttl is None:
+            return await self._client.incrby(full_key, amount)
+        # 先以NX方式创建带过期时间的计数器，再自增，保证过期时间只在首次创建时设置
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.set(full_key, 0, px=self._px(ttl), nx=True)
+            pipe.incrby(full_key, amount)
+            _, value = await pipe.execute()
+        return value
+
+    async def take_token(self, key: str, capacity: int, period: float) -> float:
+        period_ms = max(int(period * 1000), 1)
+        interval_ms = max(period_ms // capacity, 1)
+        wait_ms = await self._take_token(
+            keys=[self._key(key)], args=[interval_ms, period_ms]
+        )
+        return wait_ms / 1000
+
+    async def set_bits(self, key: str, offsets: Iterable[int]) -> None:
+        # 一条BITFIELD命令设置多个位，大批量时分段发送，避免单条命令过长
+        full_key = self._key(key)
+        args: list = []
+        for offset in offsets:
+            args.extend(("SET", "u1", offset, 1))
+            if len(args) >= 4096:
+                await self._client.execute_command("BITFIELD", full_key, *args)
+                args = []
+        if args:
+            await self._client.execute_command("BITFIELD", full_key, *args)
+
+    async def get_bits(self, key: str, offsets: Sequence[int]) -> list[bool]:
+        if not offsets:
+            return []
+        args: list = []
+        for offset in offsets:
+            args.extend(("GET", "u1", offset))
+        values = await self._client.execute_command("BITFIELD", self._key(key), *args)
+        return [bool(value) for value in values]
+
+    async def ttl(self, key: str) -> float | None:
+        remaining = await self._client.pttl(self._key(key))
+        return None if remaining < 0 else remaining / 1000
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+_state_backend: StateBackend | None = None
+
+
+def get_state_backend() -> StateBackend:
+    """获取全局状态存储实例（首次调用时按STATE_BACKEND配置创建）"""
+    global _state_backend
+    if _state_backend is None:
+        if settings.STATE_BACKEND == "redis":
+            _state_backend = RedisStateBackend(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD,
+                db=settings.REDIS_DB,
+                prefix=settings.REDIS_KEY_PREFIX,
+            )
+            logger.info(
+                f"共享状态存储：Redis {settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
+            )
+        else:
+            _state_backend = MemoryStateBackend()
+    return _state_backend
+
+
+def is_shared_state_backend() -> bool:
+    """当前状态存储是否跨进程共享（内存实现仅在单个worker内有效）"""
+    return settings.STATE_BACKEND == "redis"
+
+
+async def close_state_backend() -> None:
+    """应用关闭时释放状态存储资源"""
+    global _state_backend
+    if _state_backend is not None:
+        await _state_backend.close()
+        _state_backend = None
@@ -0,0 +1,156 @@
+"""
+静态资源指纹与预压缩
+功能：
+    1. 启动时扫描STATIC_DIR，按文件内容哈希生成带指纹的文件名清单（apple.jpg → apple.3f2a9c1b.jpg），
+       指纹URL对应的内容永不变化，响应携带Cache-Control: immutable，浏览器/CDN不再重新验证
+    2. 对可压缩的文本类资源（SVG/CSS/JS/JSON等，见COMPRESSION_CONTENT_TYPES）预先生成zstd/brotli/gzip压缩文件，
+       请求时按Accept-Encoding直接返回；JPEG/PNG/WebP等本身已压缩的格式、以及压缩后体积减少不明显的文件不生成
+    3. asset_url：将商品image_url（/images/apple.jpg）解析为指纹路径，商品列表接口直接返回指纹URL
+说明：预压缩文件以指纹文件名保存在STATIC_PRECOMPRESS_DIR，内容变化后自然对应新文件；
+     原文件在运行期间被替换时指纹不再可信，该文件退回为普通缓存策略，直到下一次启动重新构建清单
+依赖：brotli、zstandard（可选，见utils.compression；未安装时只生成gzip）
+"""
+
+import hashlib
+import logging
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path
+
+from config import settings
+from utils.compression import (
+    AVAILABLE_ENCODINGS,
+    accepted_encodings,
+    compress,
+    is_compressible,
+)
+
+logger = logging.getLogger(__name__)
+
+# 指纹URL的Cache-Control头（内容变化时URL随之变化，可以缓存一年且无需验证）
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 预压缩编码 → 压缩文件后缀
+PRECOMPRESSED_SUFFIXES = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+# 压缩后体积至少减少10%才保留压缩文件
+MIN_COMPRESSION_SAVING = 0.1
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    """清单条目：原文件 + 指纹文件名 + 可用的预压缩编码"""
+
+    path: Path
+    hashed_name: str
+    mtime_ns: int  # 构建清单时原文件的修改时间（用于判断文件是否已被替换）
+    size: int
+    encodings: tuple[str, ...] = ()
+
+    @property
+    def fresh(self) -> bool:
+        """原文件自构建清单以来是否未被修改（未修改时指纹URL才可以按immutable缓存）"""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+
+class StaticManifest:
+    """静态资源指纹清单"""
+
+    def __init__(self, url_prefix: str):
+        """
+        :param url_prefix: 静态目录挂载的URL前缀（如/images）
+        """
+        self.url_prefix = url_prefix.rstrip("/") + "/"
+        self._by_name: dict[str, StaticAsset] = {}
+        self._by_hashed_name: dict[str, StaticAsset] = {}
+        self._precompress_dir = Path()
+
+    @staticmethod
+    def _build_asset(path: Path, precompress_dir: Path) -> StaticAsset:
+        stat = path.stat()
+        data = path.read_bytes()
+        digest = hashlib.blake2b(data, digest_size=4).hexdigest()
+        hashed_name = f"{path.stem}.{digest}{path.suffix}"
+
+        encodings = []
+        if is_compressible(mimetypes.guess_type(path.name)[0]):
+            for encoding in AVAILABLE_ENCODINGS:
+                suffix = PRECOMPRESSED_SUFFIXES[encoding]
+                target = precompress_dir / f"{hashed_name}{suffix}"
+                if not target.exists():
+                    compressed = compress(data, encoding, cached=True)
+                    if len(compressed) > len(data) * (1 - MIN_COMPRESSION_SAVING):
+                        continue
+                    target.write_bytes(compressed)
+                encodings.append(encoding)
+        return StaticAsset(
+            path=path,
+            hashed_name=hashed_name,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            encodings=tuple(encodings),
+        )
+
+    def build(self, directory: str, precompress_dir: str) -> int:
+        """扫描静态目录构建清单（读取全部文件内容，应在线程中执行），返回文件数"""
+        precompress_path = Path(precompress_dir)
+        precompress_path.mkdir(parents=True, exist_ok=True)
+        by_name = {}
+        for path in sorted(Path(directory).iterdir()):
+            if path.is_file() and not path.name.startswith("."):
+                by_name[path.name] = self._build_asset(path, precompress_path)
+        # 整体替换，构建过程中的请求仍使用旧清单
+        self._by_name = by_name
+        self._by_hashed_name = {asset.hashed_name: asset for asset in by_name.values()}
+        self._precompress_dir = precompress_path
+        return len(by_name)
+
+    def get(self, name: str) -> StaticAsset | None:
+        """按原文件名查找"""
+        return self._by_name.get(name)
+
+    def get_hashed(self, hashed_name: str) -> StaticAsset | None:
+        """按指纹文件名查找"""
+        return self._by_hashed_name.get(hashed_name)
+
+    def asset_url(self, url: str | None) -> str | None:
+        """将静态资源URL解析为指纹URL（不在清单中的URL原样返回）"""
+        if not url or not url.startswith(self.url_prefix):
+            return url
+        asset = self._by_name.get(url[len(self.url_prefix) :])
+        return self.url_prefix + asset.hashed_name if asset else url
+
+    def precompressed(
+        self, asset: StaticAsset, accept_encoding: str | None
+    ) -> tuple[Path, str] | None:
+        """按请求头Accept-Encoding选择预压缩文件，返回(压缩文件路径, 编码)"""
+        if not asset.encodings:
+            return None
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in asset.encodings:
+            if encoding in accepted or "*" in accepted:
+                path = self._precompress_dir / (
+                    asset.hashed_name + PRECOMPRESSED_SUFFIXES[encoding]
+                )
+                if path.is_file():
+                    return path, encoding
+        return None
+
+
+# 全局静态资源清单实例（/images目录）
+static_manifest = StaticManifest("/images")
+
+
+def asset_url(url: str | None) -> str | None:
+    """商品图片等静态资源URL → 指纹URL（未启用指纹时原样返回）"""
+    if not settings.STATIC_FINGERPRINT_ENABLED:
+        return url
+    return static_manifest.asset_url(url)
+
+
+def build_static_manifest() -> None:
+    """构建静态资源清单（应用启动时在线程中执行）"""
+    count = static_manifest.build(settings.STATIC_DIR, settings.STATIC_PRECOMPRESS_DIR)
+    logger.info(f"静态资源清单构建完成：文件数={count}，目录={settings.STATIC_DIR}")
@@ -0,0 +1,205 @@
+"""
+用户存在性布隆过滤器
+功能：记录所有已注册的用户名和邮箱，判断"账号一定不存在"时无需查询数据库，也无需bcrypt校验
+适用场景：
+    1. 登录：随机账号探测/撞库请求在查库前直接返回401
+    2. 用户名/邮箱可用性检查：过滤器判定不存在即可用，不访问MySQL
+原理：布隆过滤器只会误判"存在"（按USER_FILTER_ERROR_RATE的概率），不会误判"不存在"；
+     误判为存在时照常查询数据库，结果仍然准确
+存储：位图保存在共享状态存储中（STATE_BACKEND=redis时多个worker/副本共享，注册写入对所有副本立即可见）；
+     内存状态存储下各worker的位图互不可见（其他worker注册的新账号会被误判为不存在），因此只在共享状态存储下启用；
+     全量构建完成后写入哨兵键，哨兵键丢失（Redis重启、清空、淘汰）说明位图不再完整，此时不信任"不存在"并后台重建
+维护：应用启动时从users表全量构建，注册成功后追加；只增不删（用户删除/改名只会增加误判，不影响正确性），
+     绕过接口直接写入数据库的账号在下一次定期重建后可见
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import unicodedata
+from typing import AsyncIterable, Iterable
+
+from sqlmodel import select
+
+from config import settings
+from database import AsyncSessionFactory
+from model.user import User
+from utils.stateBackend import StateBackend, get_state_backend, is_shared_state_backend
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_account(value: str) -> str:
+    """
+    账号归一化：MySQL默认排序规则（utf8mb4_0900_ai_ci）比较字符串时不区分大小写和重音，
+    过滤器必须按同样宽松的规则归一化，否则会把数据库中能匹配到的账号误判为不存在
+    """
+    value = unicodedata.normalize("NFKD", value.strip().casefold())
+    return "".join(ch for ch in value if not unicodedata.combining(ch))
+
+
+class BloomFilter:
+    """基于共享状态存储位图的布隆过滤器"""
+
+    def __init__(self, name: str, capacity: int, error_rate: float):
+        """
+        :param name: 过滤器名称（存储键的一部分）
+        :param capacity: 预期元素数量，超出后误判率上升
+        :param error_rate: 预期元素数量下的误判率
+        """
+        # 最优位数 m = -n·ln(p) / (ln2)²，最优哈希函数个数 k = m/n · ln2
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        # 参数写入键名，调整容量/误判率后自动使用新位图
+        self.key = f"bloom:{name}:{self.size}:{self.hash_count}"
+        # 哨兵键：全量构建完成后写入，与位图同在状态存储中，不存在说明位图已丢失或不完整
+        self.sentinel_key = f"{self.key}:built"
+        # 已完成全量构建的状态存储实例（应用重启后状态存储重建，需重新构建）
+        self._built_for: StateBackend | None = None
+
+    def offsets(self, item: str) -> list[int]:
+        """双重哈希：由一次blake2b摘要派生k个位偏移"""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    @property
+    def ready(self) -> bool:
+        """是否已完成全量构建（未构建时不能据此判断"不存在"）"""
+        return self._built_for is get_state_backend()
+
+    def invalidate(self) -> None:
+        """标记为未构建，下一次全量构建完成前不再用于判断账号不存在"""
+        self._built_for = None
+
+    async def add(self, *items: str) -> None:
+        await get_state_backend().set_bits(
+            self.key, [offset for item in items for offset in self.offsets(item)]
+        )
+
+    async def might_contain(self, item: str) -> bool:
+        """
+        返回False表示一定不存在；未构建完成、或位图丢失（哨兵键不存在）时总是返回True
+        位图丢失时标记为未构建，由调用方触发重建
+        """
+        if not self.ready:
+            return True
+        backend = get_state_backend()
+        if all(await backend.get_bits(self.key, self.offsets(item))):
+            return True
+        if await backend.get(self.sentinel_key) is None:
+            self.invalidate()
+            return True
+        return False
+
+    async def build(self, items: AsyncIterable[Iterable[str]]) -> int:
+        """全量构建：逐批写入所有元素，返回写入的元素数"""
+        backend = get_state_backend()
+        count = 0
+        async for batch in items:
+            batch = list(batch)
+            await backend.set_bits(
+                self.key, [offset for item in batch for offset in self.offsets(item)]
+            )
+            count += len(batch)
+        await backend.set(self.sentinel_key, b"1")
+        self._built_for = backend
+        return count
+
+
+# 全局用户存在性过滤器实例
+user_existence_filter = BloomFilter(
+    "users", settings.USER_FILTER_CAPACITY, settings.USER_FILTER_ERROR_RATE
+)
+
+
+async def _iter_accounts(session_factory) -> AsyncIterable[list[str]]:
+    """分批流式读取所有用户名和邮箱（已归一化）"""
+    statement = select(User.username, User.email).execution_options(yield_per=5000)
+    async with session_factory() as session:
+        result = await session.stream(statement)
+        async for partition in result.partitions():
+            yield [
+                normalize_account(value) for row in partition for value in row if value
+            ]
+            # 每批之间让出事件循环，避免大表构建时阻塞请求处理
+            await asyncio.sleep(0)
+
+
+async def rebuild_user_filter(session_factory) -> None:
+    """从users表全量构建用户存在性过滤器（内存状态存储下各worker位图不一致，不构建）"""
+    if not is_shared_state_backend():
+        logger.info("用户存在性过滤器未启用：需要共享状态存储（STATE_BACKEND=redis）")
+        return
+    count = await user_existence_filter.build(_iter_accounts(session_factory))
+    logger.info(
+        f"用户存在性过滤器构建完成：账号数={count}，位数={user_existence_filter.size}，"
+        f"哈希函数数={user_existence_filter.hash_count}"
+    )
+
+
+async def run_user_filter_refresher(session_factory, interval: float) -> None:
+    """后台定期重建过滤器（收录绕过注册接口直接写入数据库的账号）"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await rebuild_user_filter(session_factory)
+        except Exception as e:
+            logger.error(f"用户存在性过滤器定期重建失败：{str(e)}", exc_info=True)
+
+
+# 位图丢失后触发的后台重建任务（同一时间只运行一个）
+_rebuild_task: asyncio.Task | None = None
+
+
+def _schedule_rebuild() -> None:
+    """位图丢失时在后台重建（重建完成前所有查询都按"可能存在"处理）"""
+    global _rebuild_task
+    if _rebuild_task is not None and not _rebuild_task.done():
+        return
+    logger.warning("用户存在性过滤器位图不完整（哨兵键不存在或写入失败），开始后台重建")
+
+    async def rebuild():
+        try:
+            await rebuild_user_filter(AsyncSessionFactory)
+        except Exception as e:
+            logger.error(f"用户存在性过滤器重建失败：{str(e)}", exc_info=True)
+
+    _rebuild_task = asyncio.create_task(rebuild())
+
+
+async def add_account(username: str, email: str) -> None:
+    """注册成功后将用户名和邮箱加入过滤器"""
+    if not settings.USER_FILTER_ENABLED:
+        return
+    try:
+        await user_existence_filter.add(normalize_account(username), normalize_account(email))
+    except Exception as e:
+        # 写入失败时位图缺少该账号：本进程立即停止使用过滤器，避免把新用户误判为不存在
+        user_existence_filter.invalidate()
+        logger.error(f"用户存在性过滤器写入失败：用户名={username}，错误={str(e)}")
+        # 同时删除哨兵键（尽力而为），其他worker/副本随即不再信任"不存在"并各自触发后台重建
+        try:
+            await get_state_backend().delete(user_existence_filter.sentinel_key)
+        except Exception as e:
+            logger.warning(f"用户存在性过滤器哨兵键删除失败：{str(e)}")
+        if is_shared_state_backend():
+            _schedule_rebuild()
+
+
+async def account_might_exist(account: str) -> bool:
+    """用户名/邮箱是否可能已存在（False表示一定不存在，可跳过数据库查询）"""
+    if not settings.USER_FILTER_ENABLED or not is_shared_state_backend():
+        return True
+    try:
+        was_ready = user_existence_filter.ready
+        might_exist = await user_existence_filter.might_contain(normalize_account(account))
+        if was_ready and not user_existence_filter.ready:
+            _schedule_rebuild()
+        return might_exist
+    except Exception as e:
+        # 状态存储不可用时按"可能存在"处理，退回数据库查询
+        logger.warning(f"用户存在性过滤器查询失败，回退为数据库查询：{str(e)}")
+        return True
@@ -0,0 +1,121 @@
+"""
+验证码存储
+功能：统一验证码的保存和"校验通过即作废"的原子消费操作，支持两种实现：
+    1. KVVerificationCodeStore：基于共享状态存储（内存/Redis），验证码随TTL自动过期，
+       消费为单次原子"比较并删除"，不占用数据库行锁，也不会无限累积记录（STATE_BACKEND=redis时默认使用）
+    2. SQLVerificationCodeStore：基于verification_codes表（原有实现），内存状态存储下默认使用，
+       保证多worker部署时发送和校验落在不同worker上也能正常工作
+通过配置项VERIFY_CODE_STORE选择实现（默认auto），业务代码统一调用get_verification_store()获取实例
+约定：同一邮箱同一类型同时只有一个有效验证码，重新发送会覆盖旧验证码（KV实现）；
+     发送频率限制由utils.rateLimit负责
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlmodel import update, delete, or_
+
+from config import settings
+from model.verificationCode import VerificationCode
+from utils.stateBackend import StateBackend, get_state_backend, is_shared_state_backend
+
+
+class VerificationCodeStore(ABC):
+    """验证码存储接口（session为当前请求的数据库会话，KV实现不使用）"""
+
+    @abstractmethod
+    async def save(self, session, email: str, code_type: str, code: str) -> None:
+        """保存验证码，有效期为VERIFY_CODE_EXPIRE_MINUTES"""
+
+    @abstractmethod
+    async def consume(self, session, email: str, code_type: str, code: str) -> bool:
+        """验证码正确且未过期、未使用时将其作废并返回True，否则返回False（原子操作）"""
+
+
+class KVVerificationCodeStore(VerificationCodeStore):
+    """基于共享状态存储的验证码存储"""
+
+    def __init__(self, backend: StateBackend | None = None):
+        # 未指定时每次调用使用全局状态存储（应用关闭后重建的实例也能正确使用）
+        self._backend = backend
+
+    @property
+    def backend(self) -> StateBackend:
+        return self._backend or get_state_backend()
+
+    @staticmethod
+    def _code_key(email: str, code_type: str) -> str:
+        return f"vcode:{code_type}:{email}"
+
+    async def save(self, session, email: str, code_type: str, code: str) -> None:
+        await self.backend.set(
+            self._code_key(email, code_type),
+            code.encode(),
+            ttl=settings.VERIFY_CODE_EXPIRE_MINUTES * 60,
+        )
+
+    async def consume(self, session, email: str, code_type: str, code: str) -> bool:
+        return await self.backend.compare_and_delete(
+            self._code_key(email, code_type), code.encode()
+        )
+
+
+class SQLVerificationCodeStore(VerificationCodeStore):
+    """基于verification_codes表的验证码存储（写入随调用方事务提交）"""
+
+    async def save(self, session, email: str, code_type: str, code: str) -> None:
+        now = datetime.now(ZoneInfo("Asia/Shanghai"))
+        # 顺带清理该邮箱已使用或已过期的旧记录，避免表无限增长
+        await session.exec(
+            delete(VerificationCode).where(
+                VerificationCode.email == email,
+                VerificationCode.code_type == code_type,
+                or_(VerificationCode.is_used == True, VerificationCode.expires_at < now),
+            )
+        )
+        session.add(
+            VerificationCode(
+                email=email,
+                code=code,
+                expires_at=now + timedelta(minutes=settings.VERIFY_CODE_EXPIRE_MINUTES),
+                code_type=code_type,
+            )
+        )
+
+    async def consume(self, session, email: str, code_type: str, code: str) -> bool:
+        # 单条条件UPDATE完成校验和作废：不做SELECT ... FOR UPDATE，行锁只在UPDATE语句内持有
+        result = await session.exec(
+            update(VerificationCode)
+            .where(
+                VerificationCode.email == email,
+                VerificationCode.code == code,
+                VerificationCode.code_type == code_type,
+                VerificationCode.is_used == False,
+                VerificationCode.expires_at >= datetime.now(ZoneInfo("Asia/Shanghai")),
+            )
+            .values(is_used=True)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+_verification_store: VerificationCodeStore | None = None
+
+
+def get_verification_store() -> VerificationCodeStore:
+    """
+    获取全局验证码存储实例（首次调用时按VERIFY_CODE_STORE配置创建）
+    auto：共享状态存储（Redis）时使用kv，否则使用数据表，保证多worker部署下任一worker都能校验验证码
+    """
+    global _verification_store
+    if _verification_store is None:
+        store = settings.VERIFY_CODE_STORE
+        if store == "auto":
+            store = "kv" if is_shared_state_backend() else "sql"
+        if store == "sql":
+            _verification_store = SQLVerificationCodeStore()
+        else:
+            _verification_store = KVVerificationCodeStore()
+    return _verification_store
@@ -6,6 +6,7 @@ import service from "@/utils/request";
  * @param {number} [params.page=1] - 页码，从1开始
  * @param {number} [params.page_size=6] - 每页数量-默认6，范围1-100
  * @param {string} [params.category] - 可选，商品分类筛选（如"水果/家电/服饰"）
+ * @param {string} [params.fields] - 可选，返回字段（逗号分隔，如"name,price,image_url"），不传返回全部字段
  * @returns {Promise} - 返回商品列表数据（包含列表数组、总数等）
  */
 export const getProductListApi = (params) => { // 设置默认空对象
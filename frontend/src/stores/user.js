@@ -38,6 +38,7 @@ export const useUserStore = defineStore('user', () => {
     // 清除用户信息和token
     localStorage.removeItem('user')
     localStorage.removeItem('token')
+    localStorage.removeItem('refreshToken')
   }
 
   // 检查token是否有效（解析JWT的过期时间）
@@ -70,8 +71,9 @@ export const useUserStore = defineStore('user', () => {
     const userStr = localStorage.getItem('user')
     const token = localStorage.getItem('token')
 
-    // 只有同时存在用户信息和token才认为是登录状态
-    if (userStr && token && !checkTokenExpired()) {
+    // 只有同时存在用户信息和token才认为是登录状态（token过期但有刷新令牌时，请求时会自动续期）
+    const canRefresh = !!localStorage.getItem('refreshToken')
+    if (userStr && token && (!checkTokenExpired() || canRefresh)) {
       try {
         const user = JSON.parse(userStr)
         isLoggedIn.value = user.isLoggedIn
@@ -18,7 +18,9 @@ export function initTokenCheck() {
     // 每6小时检查一次Token
     checkTokenInterval = setInterval(() => {
         try {
-            if (userStore.isLoggedIn && userStore.checkTokenExpired()) {
+            // 有刷新令牌时由请求拦截器自动续期，不强制退出
+            const canRefresh = !!localStorage.getItem('refreshToken')
+            if (userStore.isLoggedIn && userStore.checkTokenExpired() && !canRefresh) {
                 ElMessage.warning('Token已过期，请重新登录')
                 userStore.logout()
                 router.push('/login')
@@ -43,12 +43,54 @@ service.interceptors.request.use(
   },
 )
 
+// 用刷新令牌换取新token（并发的多个401请求共用同一次刷新）
+let refreshingPromise = null
+const refreshAccessToken = () => {
+  if (!refreshingPromise) {
+    const refreshToken = localStorage.getItem('refreshToken')
+    refreshingPromise = axios
+      .post(`${baseURL}/token/refresh`, { refresh_token: refreshToken }, { timeout })
+      .then(({ data }) => {
+        localStorage.setItem('token', data.token)
+        localStorage.setItem('refreshToken', data.refresh_token)
+        return data.token
+      })
+      .catch((err) => {
+        localStorage.removeItem('refreshToken')
+        throw err
+      })
+      .finally(() => {
+        refreshingPromise = null
+      })
+  }
+  return refreshingPromise
+}
+
 // 4. 响应拦截器
 service.interceptors.response.use(
   (response) => {
     return response
   },
-  (error) => {
+  async (error) => {
+    // token过期：有刷新令牌时先续期，再重发原请求（每个请求只重试一次）
+    const originalConfig = error.config
+    if (
+      error.response?.status === 401 &&
+      originalConfig &&
+      !originalConfig._retried &&
+      !['/login', '/api/login'].includes(originalConfig.url) &&
+      localStorage.getItem('refreshToken')
+    ) {
+      originalConfig._retried = true
+      try {
+        const token = await refreshAccessToken()
+        originalConfig.headers.Authorization = `Bearer ${token}`
+        return service(originalConfig)
+      } catch (refreshError) {
+        console.error('刷新token失败：', refreshError)
+      }
+    }
+
     console.error('响应错误：', error)
     let errorMsg = '请求失败，请稍后重试'
 
@@ -83,6 +125,7 @@ service.interceptors.response.use(
 
             // 清除本地存储
             localStorage.removeItem('token')
+            localStorage.removeItem('refreshToken')
             localStorage.removeItem('user')
 
             // 检查当前路径，避免重复跳转